@@ -0,0 +1,222 @@
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from Systems import MCMC_1D, MCMC_2D, MCMC_lattice, kernels, lattice, multispin
+
+'''
+Headless throughput benchmark of every sampler, written to a json file so versions can be compared.
+
+Each engine is timed on every lattice size and temperature: after one warm-up call (numba compiles there) its
+work function is called until `seconds` of wall time have passed, counting proposals and flipped spins.
+Peak memory is measured separately with tracemalloc (which slows python down too much to time with it on),
+over building the system plus one call.
+
+Per result:
+    engine, size, N, T
+    unit                what a proposal is: 'spin' (single spin proposals, a sweep is N of them),
+                        'cluster' (one Wolff or block move) or 'move' (one evolve() call of the energy bias scripts)
+    proposals, flips, seconds
+    proposals_per_s, flips_per_s
+    ns_per_update       nanoseconds per spin proposal, or per flipped spin for 'cluster' and 'move' engines
+    peak_bytes          tracemalloc peak of setup + one call
+
+The Implementatios scripts are loaded from their files, they only open a window when run directly.
+'''
+
+sizes_1d = [100, 1000, 10000]
+sizes_2d = [16, 64, 256]
+sizes_3d = [8, 16, 32]
+temperatures = [1.5, 2.27, 3.5]
+seconds = 1.0           # wall time per (engine, size, T)
+engines = None          # names to run, None for all
+path = 'benchmark.json'
+default_backend = kernels.backend  # kernel backend of the engines that don't name one
+
+
+def load_script(name):
+    # Import Implementatios/<name>.py as a module without running its main loop (its folder on sys.path for _path)
+    if 'Implementatios' not in sys.path:
+        sys.path.append('Implementatios')
+    spec = importlib.util.spec_from_file_location(name, os.path.join('Implementatios', name + '.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def mcmc_1d(method):
+    def make(size, T):
+        MCMC_1D.n = size  # the 1D system reads its size from the module
+        system = MCMC_1D.System(seed=0)
+        system.T = T
+        if method == 'step':
+            def work():
+                for _ in range(1000):
+                    system.step()
+            return work, 1000, lambda: system.flips
+        return lambda: system.run(10000), 10000, lambda: system.flips
+    return make
+
+
+def mcmc_2d(method, backend=None):
+    def make(size, T):
+        if backend is not None:
+            kernels.set_backend(backend)
+        system = MCMC_2D.System(seed=0, n=size)
+        system.T = T
+        if method == 'step':
+            def work():
+                for _ in range(1000):
+                    system.step()
+            return work, 1000, lambda: system.flips
+        if method == 'run':
+            return lambda: system.run(10000), 10000, lambda: system.flips
+        if method == 'sweep':
+            return system.sweep, system.N, lambda: system.flips
+        if method == 'swendsen-wang':
+            return system.swendsen_wang, system.N, lambda: system.flips
+        return getattr(system, method), 1, lambda: system.flips
+    return make
+
+
+def geometry(name):
+    def make(size, T):
+        _, _, dims = lattice.geometries[name]
+        system = MCMC_lattice.System(seed=0, geometry=name, size=(size,) * dims, boundary='open')
+        system.T = T
+        return system.sweep, system.N, lambda: system.flips
+    return make
+
+
+def packed(size, T):
+    if size % 64:
+        return None  # multi-spin coding needs a multiple of 64 columns
+    rng = np.random.default_rng(0)
+    lattice = multispin.PackedLattice.from_spins(rng.integers(0, 2, size=(size, size)) * 2 - 1, T, seed=0)
+    return lattice.sweep, lattice.N, lambda: lattice.flips
+
+
+def legacy(name, dims):
+    def make(size, T):
+        module = load_script(name)
+        module.n, module.T, module.b = size, T, 1 / T
+        with contextlib.redirect_stdout(io.StringIO()):  # the scripts print their targets on construction
+            system = module.System()
+        flips = [0]
+
+        def work():
+            flips[0] += bool(system.evolve())
+        return work, 1, lambda: flips[0]
+    return make
+
+
+# name: (make(size, T) -> (work, proposals per call, flips()) or None to skip, dimensions, unit)
+registry = {
+    'MCMC_1D.step':             (mcmc_1d('step'), 1, 'spin'),
+    'MCMC_1D.run':              (mcmc_1d('run'), 1, 'spin'),
+    'MCMC_2D.step':             (mcmc_2d('step'), 2, 'spin'),
+    'MCMC_2D.run[numba]':       (mcmc_2d('run', 'numba'), 2, 'spin'),
+    'MCMC_2D.run[numpy]':       (mcmc_2d('run', 'numpy'), 2, 'spin'),
+    'MCMC_2D.sweep':            (mcmc_2d('sweep'), 2, 'spin'),
+    'MCMC_2D.wolff':            (mcmc_2d('wolff'), 2, 'cluster'),
+    'MCMC_2D.swendsen_wang':    (mcmc_2d('swendsen-wang'), 2, 'spin'),
+    'MCMC_2D.block_flip':       (mcmc_2d('block_flip'), 2, 'cluster'),
+    'multispin.sweep':          (packed, 2, 'spin'),
+    'MCMC_lattice.sweep[cubic]':      (geometry('cubic'), 3, 'spin'),
+    'MCMC_lattice.sweep[triangular]': (geometry('triangular'), 2, 'spin'),
+    'MCMC_lattice.sweep[honeycomb]':  (geometry('honeycomb'), 2, 'spin'),
+    '1DEnergyBias.evolve':      (legacy('1DEnergyBias', 1), 1, 'move'),
+    '2DEnergyBias.evolve':      (legacy('2DEnergyBias', 2), 2, 'move'),
+    '1DBruteForce.evolve':      (legacy('1DBruteForce', 1), 1, 'move'),
+}
+
+
+def peak_memory(make, size, T):
+    tracemalloc.start()
+    try:
+        work, _, _ = make(size, T)
+        work()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def measure(name, size, T):
+    make, dims, unit = registry[name]
+    try:
+        made = make(size, T)
+        if made is None:
+            return None
+        work, per_call, flips = made
+
+        work()  # warm-up
+        proposals, flips0 = 0, flips()
+        t0 = time.perf_counter()
+        while True:
+            work()
+            proposals += per_call
+            elapsed = time.perf_counter() - t0
+            if elapsed >= seconds:
+                break
+        flipped = flips() - flips0
+        peak = peak_memory(make, size, T)
+    finally:
+        # An engine that names a kernel backend (e.g. 'MCMC_2D.run[numpy]') must not leak it into the next ones
+        kernels.set_backend(default_backend)
+
+    updates = proposals if unit == 'spin' else flipped
+    return {'engine': name, 'size': size, 'N': size**dims, 'T': T, 'unit': unit,
+            'proposals': proposals, 'flips': int(flipped), 'seconds': elapsed,
+            'proposals_per_s': proposals / elapsed, 'flips_per_s': flipped / elapsed,
+            'ns_per_update': 1e9 * elapsed / updates if updates else None,
+            'peak_bytes': peak}
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {'commit': commit, 'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': platform.python_version(),
+            'numpy': np.__version__, 'numba': None if kernels.numba is None else kernels.numba.__version__,
+            'machine': platform.machine(), 'processor': platform.processor(), 'cpus': os.cpu_count()}
+
+
+def run(names=None):
+    # Yields the results one by one
+    for name in registry if names is None else names:
+        _, dims, _ = registry[name]
+        for size in {1: sizes_1d, 2: sizes_2d, 3: sizes_3d}[dims]:
+            for T in temperatures:
+                try:
+                    result = measure(name, size, T)
+                except ImportError as e:  # e.g. 1DBruteForce needs matplotlib
+                    result = {'engine': name, 'size': size, 'T': T, 'error': str(e)}
+                if result is not None:
+                    yield result
+
+
+if __name__ == '__main__':
+    results = []
+    print('{:>32} {:>6} {:>6} {:>14} {:>14} {:>10} {:>12}'.format('engine', 'size', 'T', 'proposals/s', 'flips/s', 'ns/update', 'peak MB'))
+    for result in run(engines):
+        results.append(result)
+        if 'error' in result:
+            print('{:>32} {:>6} {:>6} {}'.format(result['engine'], result['size'], result['T'], result['error']))
+            continue
+        print('{:>32} {:>6} {:>6} {:>14.0f} {:>14.0f} {:>10.1f} {:>12.2f}'.format(
+            result['engine'], result['size'], result['T'], result['proposals_per_s'], result['flips_per_s'],
+            result['ns_per_update'] or float('nan'), result['peak_bytes'] / 2**20))
+
+    with open(path, 'w') as f:
+        json.dump({'environment': environment(), 'seconds': seconds, 'results': results}, f, indent=1)
+    print('Written to', path)
@@ -1,5 +1,12 @@
+import numpy as np
 
-def show_energy1(lattice):
+from Systems.energy_bias import EnergyClasses, chain
+
+
+def show_energy1(lattice, J=1):
+    import matplotlib.pyplot as plt  # only needed for the plot
+
+    n = len(lattice)
     energies = []
     for i, point in enumerate(lattice):
         if i > 0 and i < n - 1:
@@ -10,34 +17,18 @@ def show_energy1(lattice):
     plt.title("Histogram with 'auto' bins")
     plt.show()
 
-def get_E(lattice):
-
-    energies = [0,0,0]
-    for i, point in enumerate(lattice):
-        if i == 0:
-            E = J * point * (2 * lattice[i+1])
-        elif i == n - 1:
-            E = J * point * (2 * lattice[i-1])
-        else:
-            E = J * point * (lattice[i + 1] + lattice[i - 1])
-
-        if E < 0: energies[0] += 1
-        elif E > 0: energies[2] += 1
-        else: energies[1] += 1
-
-    return energies / np.sum(energies)
-
-
-def evolve(lattice, target):
-
-    energies = get_E(lattice)
-
-    new_lattice = np.array(lattice)
-    i = np.random.randint(0, n)
-    new_lattice[i] *= -1
-    new_energies = get_E(new_lattice)
-    if np.linalg.norm(new_energies - target) < np.linalg.norm(energies - target):
-        return new_lattice
-    else:
-        return lattice
 
+def get_E(lattice):
+    # Classes here run the other way round (E = J * point * neighbours): Systems.energy_bias order reversed
+    return EnergyClasses(lattice, chain(len(lattice))).fractions()[::-1]
+
+
+def evolve(classes):
+    # classes = EnergyClasses(lattice, chain(n), target[::-1]), updated in place in O(1) without copying the lattice.
+    # The flip is kept if it brings the classes closer to the target
+    before = classes.distance()
+    i = np.random.randint(0, classes.N)
+    if classes.flip(i) < before:
+        return True
+    classes.flip(i)
+    return False
@@ -2,9 +2,13 @@
 import numpy as np
 import pygame
 
+import _path  # the repo root on sys.path, for Systems
+from Systems.energy_bias import EnergyClasses, chain
+from Systems.render import blit_spins, chain_cells, colour_table
+
 '''
 This file implements the 1d ising model, with the sole focus on generating a state which obeys the boltzmann distribution
-This is an initial draft algorithm which is not meant to be computationally efficient
+The energy class histogram is updated incrementally (Systems/energy_bias.py), O(1) per proposal
 
 algorithm outline:
 Calculate the distribution of energies of the entire system.
@@ -18,10 +22,14 @@ algorithm = '1D Energy Bias'
 ## PYGAME IMPLEMENTATION
 '''draw lattice points with -1 spin grey, +1 as cyan'''
 bg_color = (25, 25, 25) # (250, 250, 250)
+lut = colour_table([bg_color, (0, 50, 50), (163, 0, 30)])
 ScreenWidth, ScreenHeight = ScreenDims = (1100, 600)  # (1800, 920)
-win = pygame.display.set_mode(ScreenDims)
-pygame.display.set_caption('1D-Ising model | ' + algorithm + ' Implementation')
-pygame.display.set_icon(pygame.image.load('imgs/molecules.png'))
+def open_window():
+    # The window is only opened when the file is run as a script, importing it (e.g. Benchmark.py) stays headless
+    global win
+    win = pygame.display.set_mode(ScreenDims)
+    pygame.display.set_caption('1D-Ising model | ' + algorithm + ' Implementation')
+    pygame.display.set_icon(pygame.image.load('imgs/molecules.png'))
 
 def Poll_Events():
     for event in pygame.event.get():
@@ -33,14 +41,10 @@ def Poll_Events():
 def redraw(lattice):
     win.fill(bg_color)
 
-    # draw spins
-    colours = [0, (0, 50, 50), (163, 0, 30)]
-    for i, spin in enumerate(lattice):
-        r=10
-        w = int((r+2*i*r)/ScreenWidth)
-        nw = (ScreenWidth - 2*r)/(2*r)
-        x = r+2*r*(i-w*nw-w)
-        pygame.draw.circle(win, colours[spin], (int(x), 4*r*(1+w)), r)
+    # draw spins as 2r x 2r cells wrapped into rows, one blit through the colour lookup
+    r = 10
+    per_row = int((ScreenWidth - 2*r)/(2*r)) + 1
+    blit_spins(win, chain_cells(lattice, per_row), lut, (0, 3*r), 2*r)
     pygame.display.update()
 
 ### PYGAME IMPLEMENTATION
@@ -68,65 +72,43 @@ class System():
         self.pi = t / np.sum(t)
         print('pi:', self.pi)
         self.pidist = 1/epsilon
-        self.get_E()
-
-    def get_E(self, latt=None):
-        energies = [0, 0, 0]
-        if type(latt) == type(None):
-            latt = np.array(self.L)
-
-        for i, point in enumerate(latt):
-            if i == 0:
-                E = -J * point * (2 * latt[i + 1])
-            elif i == n - 1:
-                E = -J * point * (2 * latt[i - 1])
-            else:
-                E = -J * point * (latt[i + 1] + latt[i - 1])
+        self.classes = EnergyClasses(self.L, chain(n), self.pi, J)  # the ends see their neighbour twice
 
-            if E < 0:
-                energies[0] += 1
-            elif E > 0:
-                energies[2] += 1
-            else:
-                energies[1] += 1
-        self.E = energies / np.sum(energies)
-        return self.E
+    @property
+    def E(self): # Fraction of sites in each energy class, -2J, 0, 2J
+        return self.classes.fractions()
 
     def evolve(self, attempts=10):
         for i in np.random.randint(0,n, size=attempts):
-            if i == 0:
-                E = -J * self.L[i] * (2 * self.L[i + 1])
-            elif i == n - 1:
-                E = -J * self.L[i] * (2 * self.L[i - 1])
-            else:
-                E = -J * self.L[i] * (self.L[i + 1] + self.L[i - 1])
+            E = self.classes.energy(i)
 
             if E >= 0:
-                self.L[i] *= -1
+                self.classes.flip(i)
                 return True
             else:
-                self.L[i] *= -1
-                a = np.linalg.norm(self.get_E(latt=self.L) - self.pi)
+                a = self.classes.flip(i)
                 if a < self.pidist:
                     self.pidist = a
                     return True
                 else:
-                    self.L[i] *= -1
+                    self.classes.flip(i)
         return False
 
 
-sys = System()
+if __name__ == '__main__':
+    open_window()
+    system = System()
 
-running = True
-i = 0
-pygame.time.wait(1000)
-while running:
-    Poll_Events()
+    running = True
+    i = 0
+    pygame.time.wait(1000)
+    while running:
+        Poll_Events()
 
-    if not sys.evolve():
+        if not system.evolve():
+            if i % 50 == 0:
+                print('P:', system.E)
         if i % 50 == 0:
-            print('P:', sys.E)
-    if i % 50 == 0:
-        redraw(sys.L)
-        # print(sys.pidist, sys.E, sys.pi, np.sum(sys.L))
-    i += 1
\ No newline at end of file
+            redraw(system.L)
+            # print(system.pidist, system.E, system.pi, np.sum(system.L))
+        i += 1
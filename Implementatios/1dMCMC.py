@@ -2,6 +2,10 @@
 import numpy as np
 import pygame
 
+import _path  # the repo root on sys.path, for Systems
+from Systems.render import blit_spins, chain_cells, colour_table
+from Systems.rng import BlockRNG
+
 '''
 This file implements the 1d ising model.
 
@@ -44,6 +48,7 @@ print('Expected average energy for the lattice (N * -J tanh(b*J)): {}'.format(-n
 ## Start of pygame implementation
 '''draw lattice points with -1 spin grey, +1 as cyan'''
 bg_color = (25, 25, 25) # (250, 250, 250)
+lut = colour_table([bg_color, (0, 50, 50), (163, 0, 30)])
 ScreenWidth, ScreenHeight = ScreenDims = (1100, 650)  # (1800, 920)
 text_height_space = 20
 win = pygame.display.set_mode(ScreenDims)
@@ -59,14 +64,10 @@ def Poll_Events():
 def redraw(lattice):
     win.fill(bg_color)
 
-    # draw spins
-    colours = [0, (0, 50, 50), (163, 0, 30)]
-    for i, spin in enumerate(lattice):
-        r=10
-        w = int((r+2*i*r)/ScreenWidth)
-        nw = (ScreenWidth - 2*r)/(2*r)
-        x = r+2*r*(i-w*nw-w)
-        pygame.draw.circle(win, colours[spin], (int(x), 4*r*(1+w)), r)
+    # draw spins as 2r x 2r cells wrapped into rows, one blit through the colour lookup
+    r = 10
+    per_row = int((ScreenWidth - 2*r)/(2*r)) + 1
+    blit_spins(win, chain_cells(lattice, per_row), lut, (0, 3*r), 2*r)
     pygame.display.update()
 # End of pygame implementation
 
@@ -74,9 +75,12 @@ def redraw(lattice):
 class System():
     cache_limit = int(1e+6)  # Maximum size of cache before reset
 
-    def __init__(self):
+    def __init__(self, seed=None, block_size=None):
+        # Buffered random numbers, site indices and uniforms are drawn block_size at a time
+        self.rng = BlockRNG(n, block_size, seed)
+
         # Initialize lattice points, [1,1,-1,1,-1,...] randomly
-        self.L = np.random.randint(0, 2, size=n) * 2 - 1
+        self.L = self.rng.generator.integers(0, 2, size=n) * 2 - 1
         # initialize variables for each parameter
         self.E0 = self.get_Ei()
         self.sE = 0 # running sum
@@ -86,20 +90,40 @@ class System():
         self.sB = 0
         self.Bbar = 0
 
+        # Temperature, setting it (re)builds the acceptance table
+        self.T = T
+
     def get_Ei(self):
         Ei = 0
         for i, spin in enumerate(self.L[:-1]):
             Ei += spin * self.L[i+1]
         return Ei * -J
 
-    def get_dE(self, i): # Compute the corresponding change if spin i were to be flipped.
+    @property
+    def T(self):
+        return self._T
+
+    @T.setter
+    def T(self, T):
+        self._T = T
+        self.b = 1/T
+
+        # s * (s_prev + s_next) can only be -2...2, so tabulate dE and min(1, exp(-b*dE)) indexed by it + 2
+        k = np.arange(-2, 3)
+        self.dEs = 2 * J * k
+        self.acceptance = np.minimum(1, np.exp(-self.b * self.dEs))
+
+    def get_nb(self, i): # Sum of the neighbours of spin i
         if i == 0:
             s_prev, s_next = 0, self.L[i+1]
         elif i == n-1:
             s_prev, s_next = self.L[i-1], 0
         else:
             s_prev, s_next = self.L[i-1], self.L[i+1]
-        return 2 * J * self.L[i] * (s_next + s_prev)
+        return s_next + s_prev
+
+    def get_dE(self, i): # Compute the corresponding change if spin i were to be flipped.
+        return 2 * J * self.L[i] * self.get_nb(i)
 
     def reset_cache(self, epoch, cache_size):
         Ebari = self.sE / cache_size # retrieve average for current epoch
@@ -113,35 +137,31 @@ class System():
         self.sB += 0  # np.sum(self.L)/n
 
         # Walk in space of states
-        i = np.random.randint(0,n)
-        dE = self.get_dE(i)
-        if dE >= 0:
+        i = self.rng.site()
+        k = self.L[i] * self.get_nb(i) + 2  # index into the acceptance table
+        p = self.acceptance[k]
+        if p >= 1 or self.rng.uniform() <= p:
             self.L[i] *= -1
-            self.E += dE
-        else:
-            r = np.random.uniform(0,1)
-            if r <= np.exp(-b * dE):
-                self.L[i] *= -1
-                self.E += dE
+            self.E += self.dEs[k]
 
-sys = System()
+system = System()
 
 running = True
 iterations, iter = int(1E+10), 1
 while iter < iterations and running:
     Poll_Events()
-    sys.step()
+    system.step()
 
     if iter % 10000 == 0:
-        redraw(sys.L)
+        redraw(system.L)
     if iter % System.cache_limit == 0: # Reset cache every epoch
         epoch = iter // System.cache_limit
-        sys.reset_cache(epoch, iter)
-        print('Cache reset... epoch:',epoch,'Current average: <E>={}'.format(sys.Ebar))
+        system.reset_cache(epoch, iter)
+        print('Cache reset... epoch:',epoch,'Current average: <E>={}'.format(system.Ebar))
     iter+=1
 
 print('Terminated at iteration {} of {} ({}% complete)'.format(iter, iterations, 100*iter/iterations))
-print('Average magnetisation:', sys.sB / iter)
+print('Average magnetisation:', system.sB / iter)
 print('Expected magnetisation for a 1-d lattice: 0')
-print('Average Energy:', sys.sE / iter)
+print('Average Energy:', system.sE / iter)
 print('Expected average energy for the lattice (N * -J tanh(b*J)): {}'.format(-n*J*np.tanh(b*J)))
\ No newline at end of file
@@ -2,6 +2,10 @@
 import numpy as np
 import pygame
 
+import _path  # the repo root on sys.path, for Systems
+from Systems.render import blit_spins, chain_cells, colour_table
+from Systems.rng import BlockRNG
+
 '''
 This file implements the 1d ising model.
 
@@ -63,12 +67,18 @@ class System():
     ScreenWidth, ScreenHeight = ScreenDims = (1100, 650)  # (1800, 920)
     win = pygame.display.set_mode(ScreenDims)
     spin_colours = [0, (0, 50, 50), (163, 0, 30)]  # draw lattice points with -1 spin grey, +1 as cyan
+    lut = colour_table([bg_color, spin_colours[1], spin_colours[2]])
+    r = 10  # spins are 2r x 2r squares, rows 4r apart
+    per_row = int((ScreenWidth - 2 * r) / (2 * r)) + 1
 
-    def __init__(self):
+    def __init__(self, seed=None, block_size=None):
         # System variables:
 
+        # Buffered random numbers, site indices and uniforms are drawn block_size at a time
+        self.rng = BlockRNG(n, block_size, seed)
+
         # Initialize lattice points, [1,1,-1,1,-1,...] randomly (for now)
-        self.L = np.random.randint(0, 2, size=n) * 2 - 1
+        self.L = self.rng.generator.integers(0, 2, size=n) * 2 - 1
 
         # initialize variables for each parameter
         self.E0 = self.get_Ei()
@@ -79,17 +89,11 @@ class System():
         self.sB = 0
         self.Bbar = 0
 
+        # Temperature, setting it (re)builds the acceptance table
+        self.T = T
+
         # other variables
         self.epoch = 0
-        self.Rects = []
-        for i, spin in enumerate(self.L):
-            a = 20
-            r = 10
-            w = int((r + 2 * i * r) / System.ScreenWidth)
-            nw = (System.ScreenWidth - 2 * r) / (2 * r)
-            x = r + 2 * r * (i - w * nw - w)
-            y = 4 * r * (1 + w)
-            self.Rects.append(pygame.Rect((x,y), (a,a)))
 
     def get_Ei(self):
         Ei = 0
@@ -97,14 +101,31 @@ class System():
             Ei += spin * self.L[i+1]
         return Ei * -J
 
-    def get_dE(self, i): # Compute the corresponding change if spin i were to be flipped.
+    @property
+    def T(self):
+        return self._T
+
+    @T.setter
+    def T(self, T):
+        self._T = T
+        self.b = 1/T
+
+        # s * (s_prev + s_next) can only be -2...2, so tabulate dE and min(1, exp(-b*dE)) indexed by it + 2
+        k = np.arange(-2, 3)
+        self.dEs = 2 * J * k
+        self.acceptance = np.minimum(1, np.exp(-self.b * self.dEs))
+
+    def get_nb(self, i): # Sum of the neighbours of spin i
         if i == 0:
             s_prev, s_next = 0, self.L[i+1]
         elif i == n-1:
             s_prev, s_next = self.L[i-1], 0
         else:
             s_prev, s_next = self.L[i-1], self.L[i+1]
-        return 2 * J * self.L[i] * (s_next + s_prev)
+        return s_next + s_prev
+
+    def get_dE(self, i): # Compute the corresponding change if spin i were to be flipped.
+        return 2 * J * self.L[i] * self.get_nb(i)
 
     def reset_cache(self, epoch, cache_size):
         Ebari = self.sE / cache_size # retrieve average for current epoch
@@ -118,23 +139,18 @@ class System():
         self.sB += 0  # np.sum(self.L)/n
 
         # Walk in space of states
-        i = np.random.randint(0,n)
-        dE = self.get_dE(i)
-        if dE >= 0:
+        i = self.rng.site()
+        k = self.L[i] * self.get_nb(i) + 2  # index into the acceptance table
+        p = self.acceptance[k]
+        if p >= 1 or self.rng.uniform() <= p:
             self.L[i] *= -1
-            self.E += dE
-        else:
-            r = np.random.uniform(0,1)
-            if r <= np.exp(-b * dE):
-                self.L[i] *= -1
-                self.E += dE
+            self.E += self.dEs[k]
 
     def redraw(self):
         System.win.fill(System.bg_color)
 
-        # draw spins as squares of sides 20 pixels
-        for i, (spin, rect) in enumerate(zip(self.L, self.Rects)):
-            pygame.draw.rect(System.win, System.spin_colours[spin], rect)
+        # draw spins as squares of sides 20 pixels, wrapped into rows
+        blit_spins(System.win, chain_cells(self.L, System.per_row), System.lut, (System.r, 4 * System.r), 2 * System.r)
 
         # draw data for system
         energy_counter = System.font_local.render('<E> = {:.4f}  |  Epoch: {}'.format(self.Ebar, self.epoch), 1, (0, 60, 0))
@@ -143,25 +159,25 @@ class System():
 
         pygame.display.update()
 
-sys = System()
+system = System()
 
 running = True
 iterations, iter = int(1E+10), 1
 while iter < iterations and running:
     Poll_Events()
-    sys.step()
+    system.step()
 
     if iter % 10000 == 0:
-        sys.redraw()
+        system.redraw()
     if iter % System.cache_limit == 0: # Reset cache every epoch
         epoch = iter // System.cache_limit
-        sys.reset_cache(epoch, iter)
-        sys.epoch = epoch
-        print('Cache reset... epoch:', epoch,'Current average: <E>={}'.format(sys.Ebar))
+        system.reset_cache(epoch, iter)
+        system.epoch = epoch
+        print('Cache reset... epoch:', epoch,'Current average: <E>={}'.format(system.Ebar))
     iter+=1
 
 print('Terminated at iteration {} of {} ({}% complete)'.format(iter, iterations, 100*iter/iterations))
-print('Average magnetisation:', sys.sB / iter)
+print('Average magnetisation:', system.sB / iter)
 print('Expected magnetisation for a 1-d lattice: 0')
-print('Average Energy:', sys.sE / iter)
+print('Average Energy:', system.sE / iter)
 print('Expected average energy for the lattice (N * -J tanh(b*J)): {}'.format(-n*J*np.tanh(b*J)))
\ No newline at end of file
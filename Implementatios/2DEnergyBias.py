@@ -2,9 +2,13 @@
 import numpy as np
 import pygame
 
+import _path  # the repo root on sys.path, for Systems
+from Systems.energy_bias import EnergyClasses, square
+from Systems.render import blit_spins, colour_table
+
 '''
 This file implements the 2d ising model, with the sole focus on generating a state which obeys the boltzmann distribution
-This is an initial draft algorithm which is not meant to be computationally efficient
+The energy class histogram is updated incrementally (Systems/energy_bias.py), O(1) per proposal
 
 algorithm outline:
 Pick a random index on the lattice,
@@ -19,10 +23,14 @@ algorithm = '2D Energy Bias'
 ## PYGAME IMPLEMENTATION
 '''draw lattice points with -1 spin grey, +1 as cyan'''
 bg_color = (25, 25, 25) # (250, 250, 250)
+lut = colour_table([bg_color, (0, 50, 50), (163, 0, 30)])
 ScreenWidth, ScreenHeight = ScreenDims = (1100, 600)  # (1800, 920)
-win = pygame.display.set_mode(ScreenDims)
-pygame.display.set_caption('1D-Ising model | ' + algorithm + ' Implementation')
-pygame.display.set_icon(pygame.image.load('imgs/molecules.png'))
+def open_window():
+    # The window is only opened when the file is run as a script, importing it (e.g. Benchmark.py) stays headless
+    global win
+    win = pygame.display.set_mode(ScreenDims)
+    pygame.display.set_caption('1D-Ising model | ' + algorithm + ' Implementation')
+    pygame.display.set_icon(pygame.image.load('imgs/molecules.png'))
 
 def Poll_Events():
     for event in pygame.event.get():
@@ -33,14 +41,9 @@ def Poll_Events():
 
 def redraw(lattice):
     win.fill(bg_color)
-    # draw spins
-    colours = [0, (0, 50, 50), (163, 0, 30)]
+    # draw spins as 2r x 2r cells, spin i, j at x = i, y = j, one blit through the colour lookup
     r=10
-    for i in range(lattice.shape[0]):
-        for j in range(lattice.shape[1]):
-            x = r + 2*r*i
-            y = r + 2*r*j
-            pygame.draw.circle(win, colours[lattice[i,j]], (x,y), r)
+    blit_spins(win, lattice, lut, (0, 0), 2*r)
     pygame.display.update()
 
 ### PYGAME IMPLEMENTATION
@@ -60,91 +63,45 @@ class System():
         self.pi = t / np.sum(t)
         print('pi:', self.pi)
         self.pidist = 1/epsilon
-        self.get_E()
+        self.classes = EnergyClasses(self.L.reshape(-1), square(n), self.pi, J)  # edges reflect
         print('degenarcies', self.E/self.E[0])
 
-    @staticmethod
-    def get_Eij( i, j, latt):
-        s = latt[i, j]
-        try:
-            E = -J * s * (latt[i + 1, j] + latt[i - 1, j] + latt[i, j + 1] + latt[i, j - 1])
-        except:
-            E = 0
-            # 8 Edge cases
-            if i == 0 and j == 0:
-                E = -J * s * (2*latt[i + 1, j] + 2*latt[i, j+1])
-            elif i != n-1 and j == 0:
-                E = -J * s * (latt[i + 1, j] + latt[i - 1, j] + latt[i, j + 1] + latt[i, j - 1])
-            elif i == n-1 and j==0:
-                E = -J * s * (2*latt[i - 1, j] + 2*latt[i, j + 1])
-            elif i == 0 and j == n-1:
-                E = -J * s * (2 * latt[i + 1, j] + 2*latt[i, j - 1])
-            elif i == n-1 and j == n-1:
-                E = -J * s * (2 * latt[i - 1, j] + 2 * latt[i, j - 1])
-            elif i == 0:
-                E = -J * s * (2*latt[i + 1, j] + latt[i, j + 1] + latt[i, j - 1])
-            elif i == n-1:
-                E = -J * s * (2 * latt[i - 1, j] + latt[i, j + 1] + latt[i, j - 1])
-            elif j == n-1:
-                E = -J * s * (latt[i + 1, j] + latt[i - 1, j] + 2 * latt[i, j - 1])
-            else: assert(False)
-        return E
-
-    def get_E(self, latt=None):
-        energies = [0, 0, 0, 0, 0]
-        if type(latt) == type(None):
-            latt = np.array(self.L)
-
-        n = latt.shape[0]
-        for i in range(n):
-            for j in range(n):
-                Eij = self.get_Eij(i,j,latt)
-                if Eij == -4 * J:
-                    energies[0] += 1
-                elif Eij == -2 * J:
-                    energies[1] += 1
-                elif Eij == 0:
-                    energies[2] += 1
-                elif Eij == 2 * J:
-                    energies[3] += 1
-                elif Eij == 4 * J:
-                    energies[4] += 1
-                else:
-                    print('anomalous energy', Eij)
-                    assert (False)
-        self.E = energies / np.sum(energies)
-        return self.E
+    @property
+    def E(self): # Fraction of sites in each energy class, -4J ... 4J
+        return self.classes.fractions()
 
     def evolve(self, attempts=10):
         i, j = np.random.randint(0,n,size=2)
-        Eij = self.get_Eij(i,j,self.L)
+        k = i*n + j
+        Eij = self.classes.energy(k)
 
         if Eij >= 0:
-            self.L[i,j] *= -1
+            self.classes.flip(k)
             return True
         else:
-            self.L[i,j] *= -1
-            a = np.linalg.norm(self.get_E(latt=self.L) - self.pi)
+            a = self.classes.flip(k)
             if a < self.pidist:
                 self.pidist = a
                 return True
             else:
-                self.L[i,j] *= -1
+                self.classes.flip(k)
         return False
 
-sys = System()
+if __name__ == '__main__':
+    open_window()
+    system = System()
 
-running = True
-i = 0
-pygame.time.wait(1000)
-while running:
-    Poll_Events()
+    running = True
+    i = 0
+    pygame.time.wait(1000)
+    while running:
+        Poll_Events()
 
-    if not sys.evolve():
+        if not system.evolve():
+            if i % 50 == 0:
+                # print('P:', system.E)
+                pass
         if i % 50 == 0:
-            # print('P:', sys.E)
-            pass
-    if i % 50 == 0:
-        redraw(sys.L)
-        # print(sys.pidist, sys.E, sys.pi, np.sum(sys.L))
-    i += 1
\ No newline at end of file
+            redraw(system.L)
+            # print(system.pidist, system.E, system.pi, np.sum(system.L))
+        i += 1
@@ -2,6 +2,9 @@ import matplotlib.pyplot as plt
 import numpy as np
 import pygame
 
+import _path  # the repo root on sys.path, for Systems
+from Systems.render import blit_spins, colour_table
+
 '''
 This file implements the 1d ising model, with the sole focus on generating a state which obeys the boltzmann distribution
 This is an initial draft algorithm which is not meant to be computationally efficient
@@ -18,6 +21,7 @@ version = '0.1'
 ## PYGAME IMPLEMENTATION
 '''draw lattice points with -1 spin grey, +1 as cyan'''
 bg_color = (25, 25, 25) # (250, 250, 250)
+lut = colour_table([bg_color, (0, 50, 50), (163, 0, 30)])
 ScreenWidth, ScreenHeight = ScreenDims = (1100, 300)  # (1800, 920)
 win = pygame.display.set_mode(ScreenDims)
 pygame.display.set_caption('1D-Ising model | Version ' + version)
@@ -30,14 +34,11 @@ def Poll_Events():
 
 
 def redraw(lattice, loop):
-    print(lattice)
     win.fill(bg_color)
 
-    # draw spins
-    colours = [0, (0, 50, 50), (163, 0, 30)]
-    for i, spin in enumerate(lattice):
-        r=10
-        pygame.draw.circle(win, colours[spin], (r+2*i*r,loop+ScreenHeight//2), r)
+    # draw spins as one row of 2r x 2r cells, one blit through the colour lookup
+    r=10
+    blit_spins(win, lattice[:, None], lut, (0, loop+ScreenHeight//2-r), 2*r)
 
     pygame.display.update()
 
@@ -150,16 +151,16 @@ class System():
             return False
 
 
-sys = System()
+system = System()
 
 running = True
 i = 0
 while running:
     Poll_Events()
 
-    sys.evolve()
+    system.evolve()
 
     if i % 50 == 0:
-        redraw(sys.L, loop=0)
-        # print(sys.pidist, sys.E, sys.pi, np.sum(sys.L))
+        redraw(system.L, loop=0)
+        # print(system.pidist, system.E, system.pi, np.sum(system.L))
     i+=1
\ No newline at end of file
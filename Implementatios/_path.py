@@ -0,0 +1,11 @@
+import os
+import sys
+
+'''
+Imported first by the scripts in this folder: puts the repo root on sys.path, so the shared Systems package
+imports when a script is run directly (python Implementatios/2D_MCMC.py from the repo root, where imgs/ is).
+'''
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if root not in sys.path:
+    sys.path.insert(0, root)
@@ -0,0 +1,23 @@
+import numpy as np
+
+from Systems.phase_diagram import columns, run
+
+'''
+Phase diagram of the 2D model: every lattice size x temperature point runs on its own core
+and the means, error bars and variances end up in one csv table.
+'''
+
+temperatures = np.linspace(1.5, 3.5, 41)
+sizes = [16, 32, 64]
+sweeps = 10000          # recorded sweeps per point
+burn_in = 1000          # sweeps thrown away before recording
+cluster_updates = 0     # Wolff clusters per sweep, helps decorrelation near Tc
+target_samples = None   # stop each point at this many independent samples (automatic burn-in), None for fixed sweeps
+path = 'phase_diagram.csv'
+
+if __name__ == '__main__':
+    print('Points: {}, Sweeps per point: {}, Output: {}'.format(len(temperatures) * len(sizes), sweeps, path))
+    table = run(temperatures, sizes, sweeps, burn_in, cluster_updates, path, target_samples=target_samples)
+    print(' '.join('{:>10}'.format(c) for c in columns))
+    for row in table:
+        print(' '.join('{:>10.4f}'.format(x) for x in row))
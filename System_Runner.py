@@ -1,41 +1,116 @@
+import os
+
 from Systems.MCMC_2D import *
+from Systems import checkpoint
+from Systems.convergence import Convergence
+from Systems.profiling import Profiler
+from Systems.scheduler import Scheduler
+from Systems.trajectory import TrajectoryWriter
+
+headless = False  # run without a window, pygame is never imported
 
+System.boundary = 'open'  # 'open', 'periodic' or 'helical', see Systems/lattice.py
 sys = System()
+sys.epoch = 0
+
+target_samples = None  # stop after burn-in plus this many independent samples, None to run all Iterations
+target_error = None  # or once the error bars of E/N and |M| are at most this
+convergence = None
+extra = {}  # saved along with the system in checkpoints
+if target_samples is not None or target_error is not None:
+    extra['convergence'] = convergence = Convergence(sys, target_samples, target_error)
+
+checkpoint_path = None  # e.g. 'run.ckpt': resume from it if it exists, and save to it while running
+checkpoint_interval = 600  # seconds of wall time between checkpoints
+checkpointer = None
+resumed = False
+if checkpoint_path is not None:
+    if os.path.exists(checkpoint_path):
+        checkpoint.load(checkpoint_path, sys, extra)
+        resumed = True
+        print('Resumed from {} at epoch {}'.format(checkpoint_path, sys.epoch))
+    checkpointer = checkpoint.Checkpointer(sys, checkpoint_path, checkpoint_interval, extra)
 
-def Poll_Events():
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            global running
-            running = False
+if not headless:
+    from Systems.render import Renderer2D
+    sys.renderer = renderer = Renderer2D(sys)
+    renderer.wait(500)
 
 Iterations = int(1e+8)
 System.cache_limit = int(1e+3)
-epochs = Iterations // System.cache_limit
-print('Epochs: {}, Cache limit: {}, Iterations: {}'.format(epochs, System.cache_limit, Iterations))
-counter = False
-pygame.time.wait(500)
-running = True
-while running:
-    for epoch in range(1, epochs+1):
-        if epoch % 25 == 0:
-            sys.jump()
-        sys.redraw()
-        for iter in range(System.cache_limit):
-            Poll_Events()
-            sys.step()
-            if counter and iter % 1e4 == 0:
-                sys.blit_counter(iter)
+checkerboard = True  # update the lattice with whole checkerboard sweeps instead of sequential single steps
+cluster_updates = 0  # cluster moves (System.cluster) mixed in every epoch, 0 for local dynamics only (1 near Tc)
+frame_rate = 30  # redraws and event polls per second, independent of the step rate
+proposals = sys.N if checkerboard else System.cache_limit  # spin proposals per epoch, a sweep is N of them
+epochs = Iterations // proposals
+print('Epochs: {}, Proposals per epoch: {}, Iterations: {}'.format(epochs, proposals, epochs * proposals))
+trajectory_path = None  # e.g. 'run': record bit-packed lattice frames to run.npy + run.index.npy
+record_every = 100  # epochs between recorded frames
+recorder = None
+if trajectory_path is not None:
+    # After a resume the frames recorded so far are kept, minus any from epochs that will be run again
+    recorder = TrajectoryWriter(trajectory_path, sys.L.shape, epochs // record_every + 1, append=resumed, after=sys.epoch)
+profile = False  # time each phase, show flips/s and acceptance in the HUD and log a JSON line per epoch
+profile_path = None  # file for the JSON lines, None for stdout
+profiler = None
+if profile:
+    profiler = Profiler(None if profile_path is None else open(profile_path, 'w'))
+    profiler.attach(sys, None if headless else renderer)
+
+def Epoch():
+    # One chunk of simulation work, False once all epochs are done
+    if sys.epoch >= epochs:  # e.g. resumed from the final checkpoint of a finished run
+        return False
+    sys.epoch += 1
+    for _ in range(cluster_updates):
+        sys.jump()
+    if checkerboard:
+        sys.sweep()
+    else:
+        sys.run(System.cache_limit)
+    sys.measure()
+    if recorder is not None and sys.epoch % record_every == 0:
+        recorder.add(sys.epoch, sys.E, sys.B, sys.L)
 
-        sys.epoch = epoch
-        sys.reset_cache()
-        #print('Cache reset... epoch:', epoch, 'Current average: <E>={:.8f} | <B>={:.8f} | Total steps: {} | E - Calculated E = {}'.format(
-        #    sys.Ebar, sys.Bbar, epoch * System.cache_limit, sys.E - sys.get_Ei()))
+    sys.reset_cache()
+    #print('Cache reset... epoch:', sys.epoch, 'Current average: <E>={:.8f} | <B>={:.8f} | Total steps: {} | E - Calculated E = {}'.format(
+    #    sys.Ebar, sys.Bbar, sys.epoch * proposals, sys.E - sys.get_Ei()))
+    more = convergence is None or convergence.update()
+    # Checkpoint once the epoch is complete, convergence included, so a resume carries on from exactly here
+    if checkpointer is not None:
+        checkpointer.update()
+    return more and sys.epoch < epochs
 
+def Refresh():
+    # Poll events and redraw, False when the window is closed
+    if not renderer.poll():
+        return False
     sys.redraw()
+    return True
 
-print('Average magnetisation:', sys.sB / iter)
+scheduler = Scheduler(frame_rate)
+running = scheduler.run(Epoch, None if headless else Refresh)
+print(scheduler.report())
+if checkpointer is not None:
+    checkpointer.save(wait=True)
+if recorder is not None:
+    recorder.close()
+if profiler is not None:
+    profiler.detach()
+if convergence is not None:
+    print(convergence.report())
+
+print('Average magnetisation:', sys.Bbar)
 print('Expected magnetisation for a 1-d lattice: 0')
 print('Energies:', sys.Ebar, sys.Ebar)
 print('-Jtanh(Jb): {}'.format(-J*np.tanh(b*J)))
+print('E/N = {E:.6f} +- {E_err:.6f} | |M| = {M:.6f} +- {M_err:.6f} | C = {C:.4f} | chi = {chi:.4f} | U = {U:.4f}'.format(
+    **sys.obs.summary(sys.T)))
 
-pygame.quit()
\ No newline at end of file
+if not headless:
+    # Keep the final state on screen until the window is closed
+    while running:
+        sys.redraw()
+        running = renderer.poll()
+        renderer.wait(1000 // frame_rate)
+    renderer.quit()
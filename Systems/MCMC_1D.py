@@ -1,6 +1,9 @@
 # import matplotlib.pyplot as plt
 import numpy as np
-import pygame
+
+from Systems import kernels, lattice, transfer_matrix
+from Systems.observables import Observables
+from Systems.rng import BlockRNG
 
 '''
 This file implements the 1d ising model.
@@ -37,7 +40,7 @@ epsilon = 1e-7
 
 
 print('Expected magnetisation for a 1-d lattice: 0')
-print('Expected average energy for the lattice (N * -J tanh(b*J)): {}'.format(-n*J*np.tanh(b*J)))
+print('Exact average energy for the open chain (transfer matrix): {}'.format(n * transfer_matrix.chain(n, T, J)['E']))
 
 # End of pygame implementation
 
@@ -48,20 +51,27 @@ class System():
 
     cache_limit = int(1e+6)  # Maximum size of cache before reset
 
-    pygame.init()
-    pygame.display.set_caption('1D-Ising model | ' + algorithm + ' Implementation')
-    pygame.display.set_icon(pygame.image.load('imgs/molecules.png'))
-    font_local = pygame.font.SysFont('bahnschrift', 16)
-    bg_color = (25, 25, 25) # (250, 250, 250)
-    ScreenWidth, ScreenHeight = ScreenDims = (1100, 650)  # (1800, 920)
-    win = pygame.display.set_mode(ScreenDims)
-    spin_colours = [0, (0, 50, 50), (163, 0, 30)]  # draw lattice points with -1 spin grey, +1 as cyan
+    boundary = 'open'  # 'open' or 'periodic' (helical is the same as periodic for a chain)
+
+    renderer = None  # Systems.render.Renderer1D, created by the first redraw()
+    profiler = None  # Systems.profiling.Profiler while one is attached
 
-    def __init__(self):
+    def __init__(self, seed=None, block_size=None, boundary=None):
         # System variables:
+        self.boundary = System.boundary if boundary is None else boundary
+
+        # [previous, next] of every site, missing neighbours point at the sentinel n
+        self.nbr = lattice.chain(n, self.boundary)
+        self.nbr_list = self.nbr.tolist()
+
+        # Buffered random numbers, site indices and uniforms are drawn block_size at a time
+        self.rng = BlockRNG(n, block_size, seed)
 
         # Initialize lattice points, [1,1,-1,1,-1,...] randomly (for now)
-        self.L = np.random.randint(0, 2, size=n) * 2 - 1
+        # S is the lattice plus the sentinel S[n] = 0, L is a view of the spins (always update L in place)
+        self.S = np.zeros(n + 1, dtype=np.int64)
+        self.L = self.S[:n]
+        self.L[:] = self.rng.generator.integers(0, 2, size=n) * 2 - 1
 
         # initialize variables for each parameter
         self.E0 = self.get_Ei()
@@ -69,35 +79,50 @@ class System():
         self.Ebar = 0       # will be updated with each cache reset (end of each epoch).
         self.E = self.E0    # will be stored and changed by dE with each iteration to save compute
 
+        self.B = self.get_Bi()
         self.sB = 0
         self.Bbar = 0
 
+        # Temperature, setting it (re)builds the acceptance table and starts new statistics (self.obs)
+        self.T = T
+
         # other variables
         self.epoch = 0
-        self.Rects = []
-        for i, spin in enumerate(self.L):
-            a = 20
-            r = 10
-            w = int((r + 2 * i * r) / System.ScreenWidth)
-            nw = (System.ScreenWidth - 2 * r) / (2 * r)
-            x = r + 2 * r * (i - w * nw - w)
-            y = 4 * r * (1 + w)
-            self.Rects.append(pygame.Rect((x,y), (a,a)))
+        self.flips = 0  # spins flipped so far
 
     def get_Ei(self):
-        Ei = 0
-        for i, spin in enumerate(self.L[:-1]):
-            Ei += spin * self.L[i+1]
-        return Ei * -J
+        return lattice.chain_energy(self.L, J, self.boundary)
+
+    def get_Bi(self):
+        return lattice.magnetisation(self.L)
+
+    @property
+    def T(self):
+        return self._T
+
+    @T.setter
+    def T(self, T):
+        self._T = T
+        self.b = 1/T
+
+        # s * (s_prev + s_next) can only be -2...2, so tabulate dE and min(1, exp(-b*dE)) indexed by it + 2
+        k = np.arange(-2, 3)
+        self.dEs = 2 * J * k
+        self.acceptance = np.minimum(1, np.exp(-self.b * self.dEs))
+
+        # Streaming E, |M| statistics fed by measure(), samples at another temperature don't belong in them
+        self.obs = Observables(n)
+
+    def get_nb(self, i): # Sum of the neighbours of spin i, the sentinel adds 0 for missing ones
+        prev, next = self.nbr_list[i]
+        return self.S[prev] + self.S[next]
 
     def get_dE(self, i): # Compute the corresponding change if spin i were to be flipped.
-        if i == 0:
-            s_prev, s_next = 0, self.L[i+1]
-        elif i == n-1:
-            s_prev, s_next = self.L[i-1], 0
-        else:
-            s_prev, s_next = self.L[i-1], self.L[i+1]
-        return 2 * J * self.L[i] * (s_next + s_prev)
+        return 2 * J * self.L[i] * self.get_nb(i)
+
+    def measure(self):
+        # Add the current state to the streaming statistics, call once per sweep (or any fixed amount of work)
+        self.obs.add(self.E, self.B)
 
     def reset_cache(self, epoch, cache_size):
         Ebari = self.sE / cache_size # retrieve average for current epoch
@@ -108,30 +133,31 @@ class System():
     def step(self):
         # Calculate properties wanted
         self.sE += self.E
-        self.sB += 0  # np.sum(self.L)/n
+        self.sB += self.B
 
         # Walk in space of states
-        i = np.random.randint(0,n)
-        dE = self.get_dE(i)
-        if dE >= 0:
+        i = self.rng.site()
+        k = self.L[i] * self.get_nb(i) + 2  # index into the acceptance table
+        p = self.acceptance[k]
+        if p >= 1 or self.rng.uniform() <= p:
             self.L[i] *= -1
-            self.E += dE
-        else:
-            r = np.random.uniform(0,1)
-            if r <= np.exp(-b * dE):
-                self.L[i] *= -1
-                self.E += dE
+            self.E += self.dEs[k]
+            self.B += 2*self.L[i] / n
+            self.flips += 1
+
+    def run(self, steps):
+        # Equivalent to calling step() steps times, but the proposals run in one compiled kernel
+        sites = self.rng.generator.integers(0, n, size=steps)
+        uniforms = self.rng.generator.random(steps)
+        _, self.E, self.B, sE, sB, accepted = kernels.metropolis(self.S, self.nbr, self.E, self.B, self.acceptance,
+                                                                 self.dEs, sites, uniforms)
+        self.sE += sE
+        self.sB += sB
+        self.flips += accepted
 
     def redraw(self):
-        System.win.fill(System.bg_color)
-
-        # draw spins as squares of sides 20 pixels
-        for i, (spin, rect) in enumerate(zip(self.L, self.Rects)):
-            pygame.draw.rect(System.win, System.spin_colours[spin], rect)
-
-        # draw data for system
-        energy_counter = System.font_local.render('<E> = {:.4f}  |  Epoch: {}'.format(self.Ebar, self.epoch), 1, (0, 60, 0))
-
-        System.win.blit(energy_counter, (5, 5))
-
-        pygame.display.update()
+        # pygame is only imported and initialised the first time the system is drawn
+        if self.renderer is None:
+            from Systems.render import Renderer1D
+            self.renderer = Renderer1D(self)
+        self.renderer.redraw(self)
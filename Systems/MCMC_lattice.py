@@ -0,0 +1,250 @@
+import numpy as np
+
+from Systems import clusters, kernels, lattice
+from Systems.observables import Observables
+from Systems.rng import BlockRNG
+
+'''
+This file implements the ising model on any geometry of Systems.lattice (chain, square, cubic, triangular,
+honeycomb).
+
+The geometry only enters through its neighbour table, built once: the local field of site k is gathered as
+S[nbr[k]].sum() (the sentinel S[N] = 0 stands in for missing neighbours), so there is one code path and no
+boundary logic per step for every geometry and dimension. For z neighbours s * (sum of neighbours) runs over
+-z...z, which indexes the tabulated dE and acceptance.
+
+Moves (MCMC_2D.System is the square case of this class, with 2D extras):
+    step()          one Metropolis proposal at a random site
+    run(steps)      steps proposals in the compiled kernel of Systems.kernels
+    sweep()         N heat-bath updates, colour class by colour class (lattice.colouring), each class gathered
+                    and updated as arrays: two classes for bipartite lattices, three for the triangular one (a
+                    greedy colouring where the boundaries break the usual pattern). Heat-bath rather than
+                    Metropolis: a Metropolis class update always flips at dE = 0, which is not ergodic on a ring
+    wolff(), swendsen_wang() through jump(), by the name in cluster
+
+usage:
+    system = System(seed=0, geometry='cubic', size=(16, 16, 16), boundary='periodic')
+    system.T = 4.5
+    for _ in range(1000):
+        system.sweep()
+        system.measure()
+    system.obs.summary(system.T)
+'''
+
+# Hyperparameters
+J = 1     # coupling constant
+T = 4.5
+
+
+class System():
+    algorithm = 'MCMC (Metropolis) Sampling'
+    cluster = 'wolff'  # update used by jump(), a key of jumps
+    jumps = {'wolff': 'wolff', 'swendsen-wang': 'swendsen_wang'}  # cluster name: method
+
+    cache_limit = int(1e+6)  # Maximum size of cache before reset
+    geometry = 'cubic'  # see Systems.lattice.geometries
+    size = (16, 16, 16)
+    boundary = 'periodic'  # 'open', 'periodic' or 'helical', see Systems.lattice
+
+    profiler = None  # Systems.profiling.Profiler while one is attached
+
+    def __init__(self, seed=None, block_size=None, geometry=None, size=None, boundary=None, temperature=None):
+        # System variables, the class attributes (of a subclass too) are the defaults:
+        self.geometry = self.geometry if geometry is None else geometry
+        self.size = tuple(self.size if size is None else size)
+        self.boundary = self.boundary if boundary is None else boundary
+        self.N = int(np.prod(self.size))
+
+        # Neighbours of every flat site, missing neighbours point at the sentinel N
+        self.nbr = lattice.neighbours(self.geometry, self.size, self.boundary)
+        self.nbr_list = self.nbr.tolist()
+        self.z = self.nbr.shape[1]
+
+        # Buffered random numbers, site indices and uniforms are drawn block_size at a time
+        self.rng = BlockRNG(self.N, block_size, seed)
+
+        # S is the flat lattice plus the sentinel S[N] = 0, L is a view of it in the lattice shape (update in place)
+        self.S = np.zeros(self.N + 1, dtype=np.int64)
+        self.L = self.S[:self.N].reshape(self.size)
+        self.L[...] = self.rng.generator.integers(0, 2, size=self.size) * 2 - 1
+
+        # initialize variables for each parameter
+        self.E0 = self.get_Ei()
+        self.sE = 0         # running sum for each epoch
+        self.Ebar = 0       # will be updated with each cache reset (end of each epoch).
+        self.E = self.E0    # will be stored and changed by dE with each iteration to save compute
+        self.latest_Ebar=0  # used for analysis only
+
+        self.B0 = self.get_Bi()
+        self.sB = 0
+        self.Bbar = 0
+        self.B = self.B0
+        self.latest_Bbar = 0
+
+        self.ns = 0         # number of samples added to sE/sB this epoch
+
+        # Temperature, setting it (re)builds the acceptance table and starts new statistics (self.obs)
+        self.T = T if temperature is None else temperature
+
+        # Colour classes (flat sites), no two sites of one class are neighbours so a class is updated at once
+        self.sublattices = lattice.colouring(self.nbr, lattice.patterns(self.geometry, self.size))
+
+        # Every bond once as flat site index pairs, used by Swendsen-Wang
+        self.bonds = lattice.all_bonds(self.nbr)
+
+        # Work arrays of the Wolff kernel and the number of uniforms to draw for the next cluster
+        self.visited = np.zeros(self.N + 1, dtype=np.uint8)
+        self.stack = np.empty(self.N, dtype=np.int64)
+        self.wolff_draws = 64
+
+        # other variables
+        self.epoch = 1
+        self.flips = 0  # spins flipped so far, by any move
+
+    def get_Ei(self):
+        return lattice.energy(self.S, self.nbr, J)
+
+    def get_Bi(self):
+        return lattice.magnetisation(self.L)
+
+    @property
+    def T(self):
+        return self._T
+
+    @T.setter
+    def T(self, T):
+        self._T = T
+        self.b = 1/T
+
+        # s * (sum of neighbours) can only be -z...z, so tabulate dE and min(1, exp(-b*dE)) indexed by it + z
+        k = np.arange(-self.z, self.z + 1)
+        self.dEs = 2 * J * k
+        self.acceptance = np.minimum(1, np.exp(-self.b * self.dEs))
+        self.heat_bath = 1 / (1 + np.exp(self.b * self.dEs))  # flip probability of sweep(), below 1 at dE = 0
+
+        # Streaming E, |M| statistics fed by measure(), samples at another temperature don't belong in them
+        self.obs = Observables(self.N)
+
+        # Wolff bond activation probability
+        self.p_add = 1 - np.exp(-2 * self.b * J)
+
+    def local_field(self, k): # Sum of the neighbours of flat site k, the sentinel adds 0 for missing ones
+        S = self.S
+        field = 0
+        for x in self.nbr_list[k]:
+            field += S[x]
+        return field
+
+    def get_dE(self, k): # Compute the corresponding change if spin k were to be flipped.
+        return 2 * J * self.S[k] * self.local_field(k)
+
+    def measure(self):
+        # Add the current state to the streaming statistics, call once per sweep (or any fixed amount of work)
+        self.obs.add(self.E, self.B)
+
+    def reset_cache(self):
+        ns = max(self.ns, 1)  # samples taken this epoch (steps, jumps and sweeps each add one)
+        Ebari = self.sE / ns  # retrieve average for current epoch
+        self.latest_Ebar = Ebari
+        self.Ebar = self.Ebar + (Ebari - self.Ebar) / self.epoch  # update running average
+
+        Bbari = self.sB / ns  # retrieve average for current epoch
+        self.latest_Bbar = Bbari
+        self.Bbar += (Bbari - self.Bbar) / self.epoch  # update running average
+
+        self.sE = 0
+        self.sB = 0
+        self.ns = 0
+
+    def step(self):
+        # Calculate properties wanted
+        self.sE += self.E
+        self.sB += self.B
+        self.ns += 1
+
+        # Walk in space of states
+        k = self.rng.site()
+        a = self.S[k] * self.local_field(k) + self.z  # index into the acceptance table
+        p = self.acceptance[a]
+        if p >= 1 or self.rng.uniform() <= p:
+            self.S[k] *= -1
+            self.E += self.dEs[a]
+            self.B += 2*self.S[k] / self.N
+            self.flips += 1
+
+    def run(self, steps):
+        # Equivalent to calling step() steps times, but the proposals run in one compiled kernel
+        sites = self.rng.generator.integers(0, self.N, size=steps)
+        uniforms = self.rng.generator.random(steps)
+        _, self.E, self.B, sE, sB, accepted = kernels.metropolis(self.S, self.nbr, self.E, self.B, self.acceptance,
+                                                                 self.dEs, sites, uniforms)
+        self.sE += sE
+        self.sB += sB
+        self.flips += accepted
+        self.ns += steps
+
+    def sweep(self):
+        # Calculate properties wanted
+        self.sE += self.E
+        self.sB += self.B
+        self.ns += 1
+
+        # One heat-bath pass over each colour class, N proposals in total
+        S = self.S
+        for sites in self.sublattices:
+            k = S[sites] * S[self.nbr[sites]].sum(axis=1) + self.z
+            r = self.rng.generator.random(len(sites))
+            accept = r < self.heat_bath[k]
+            flip = sites[accept]
+            S[flip] *= -1
+            self.E += np.sum(self.dEs[k[accept]])
+            self.B += 2 * np.sum(S[flip]) / self.N
+            self.flips += len(flip)
+
+    def jump(self):
+        # Cluster move, mixed in between local updates
+        getattr(self, self.jumps[self.cluster])()
+
+    def wolff(self):
+        # Calculate properties wanted
+        self.sE += self.E
+        self.sB += self.B
+        self.ns += 1
+
+        # Grow a cluster from a random seed in the compiled kernel, adding aligned neighbours with probability
+        # p_add. The uniforms it needs are not known in advance: if they run out it is called again with more
+        k = self.rng.site()
+        s = self.S[k]
+        uniforms = self.rng.generator.random(self.wolff_draws)
+        while True:
+            size, mutot, used = kernels.wolff(self.S, self.nbr, k, self.p_add, uniforms, self.visited, self.stack)
+            if size >= 0:
+                break
+            uniforms = np.concatenate((uniforms, self.rng.generator.random(len(uniforms))))
+        self.wolff_draws = max(64, 2 * used)
+
+        # The cluster is always flipped, the acceptance is built into p_add
+        self.E += 2 * J * s * mutot
+        self.B -= 2 * s * size / self.N
+        self.flips += size
+
+    def swendsen_wang(self):
+        # Calculate properties wanted
+        self.sE += self.E
+        self.sB += self.B
+        self.ns += 1
+
+        # Activate bonds between aligned neighbours with probability p_add, label the clusters they form
+        S = self.S
+        a, b = self.bonds
+        active = (S[a] == S[b]) & (self.rng.generator.random(len(a)) < self.p_add)
+        roots = clusters.label_clusters(self.N, a[active], b[active])
+
+        # Flip every cluster with probability 1/2 (one coin per root)
+        flip = self.rng.generator.random(self.N) < 0.5
+        flip = flip[roots]
+        S[:self.N][flip] *= -1
+        self.flips += np.count_nonzero(flip)
+
+        self.E = self.get_Ei()
+        self.B = self.get_Bi()
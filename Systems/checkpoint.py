@@ -0,0 +1,181 @@
+import importlib
+import json
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+'''
+Checkpoint/restart for MCMC_1D.System, MCMC_2D.System and MCMC_lattice.System.
+
+A checkpoint is one binary file:
+    b'ISINGCKP' | header length (uint64, little endian) | JSON header | padding | lattice
+The header holds the system class, its size and boundary, T, the energy/magnetisation scalars and running
+sums, the streaming statistics (Systems/observables.py) and the BlockRNG state, which is the bit generator
+state plus the state each buffered block was drawn from. Objects driving the run (e.g. a Convergence) can be
+saved along in 'extra', a dict of name: object with get_state()/set_state(). The lattice follows at a 64 byte aligned offset as
+raw int8 spins, so read_lattice() can memory map it without loading the file.
+
+Restoring all of it makes a resumed run continue with exactly the same random numbers and arithmetic, i.e.
+bit-identical to a run that was never stopped.
+
+Files are written to path + '.tmp' and renamed over path, so a crash mid-write leaves the previous checkpoint.
+Checkpointer copies the state in the simulation thread (a lattice copy) and writes it on a background thread,
+at most once per interval seconds of wall time.
+
+usage:
+    save(system, 'run.ckpt', extra={'convergence': convergence})
+    system = load('run.ckpt')           # or load('run.ckpt', system, extra) to restore into existing objects
+    checkpointer = Checkpointer(system, 'run.ckpt', interval=600, extra={'convergence': convergence})
+    checkpointer.update()               # between chunks of work
+    checkpointer.close()
+'''
+
+MAGIC = b'ISINGCKP'
+VERSION = 1
+ALIGN = 64
+
+# Scalars restored as they are, any the system doesn't have are skipped (MCMC_1D keeps fewer)
+scalars = ('E0', 'E', 'sE', 'Ebar', 'latest_Ebar', 'B0', 'B', 'sB', 'Bbar', 'latest_Bbar', 'ns', 'epoch',
+           'wolff_draws', 'flips')
+
+
+def python(x):
+    # numpy scalars to python numbers for JSON
+    return x.item() if isinstance(x, np.generic) else x
+
+
+def state(system, extra=None):
+    # (header, lattice copy) of the system and the extra objects, cheap enough to take between chunks of work
+    init = {'boundary': system.boundary}
+    if hasattr(system, 'm'):
+        init.update(n=system.n, m=system.m)
+    elif hasattr(system, 'geometry'):
+        init.update(geometry=system.geometry, size=list(system.size))
+    header = {'version': VERSION,
+              'module': type(system).__module__,
+              'init': init,
+              'T': python(system.T),
+              'scalars': {name: python(getattr(system, name)) for name in scalars if hasattr(system, name)},
+              'obs': system.obs.get_state(),
+              'rng': system.rng.get_state(),
+              'extra': {name: obj.get_state() for name, obj in (extra or {}).items()},
+              'shape': list(system.L.shape),
+              'dtype': 'int8'}
+    return header, system.L.astype(np.int8)
+
+
+def write(path, header, lattice):
+    # Pad the header with spaces so the lattice starts at a multiple of ALIGN
+    body = json.dumps(header).encode()
+    body = body.ljust(-(-(len(MAGIC) + 8 + len(body)) // ALIGN) * ALIGN - len(MAGIC) - 8)
+
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(body)))
+        f.write(body)
+        f.write(np.ascontiguousarray(lattice).tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def save(system, path, extra=None):
+    write(path, *state(system, extra))
+
+
+def read_header(path):
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError('{} is not a checkpoint'.format(path))
+        length, = struct.unpack('<Q', f.read(8))
+        header = json.loads(f.read(length))
+    header['offset'] = len(MAGIC) + 8 + length
+    if header['version'] != VERSION:
+        raise ValueError('Checkpoint version {} is not supported (expected {})'.format(header['version'], VERSION))
+    return header
+
+
+def read_lattice(path, header=None):
+    # Read only memory map of the saved spins
+    if header is None:
+        header = read_header(path)
+    return np.memmap(path, dtype=header['dtype'], mode='r', offset=header['offset'], shape=tuple(header['shape']))
+
+
+def load(path, system=None, extra=None):
+    # Restore into system, or into a new system of the saved class, and the extra objects saved with it
+    header = read_header(path)
+    if system is None:
+        System = importlib.import_module(header['module']).System
+        system = System(**header['init'])
+    lattice = read_lattice(path, header)
+    if system.L.shape != lattice.shape:
+        raise ValueError('Checkpoint lattice {} does not fit the system {}'.format(lattice.shape, system.L.shape))
+
+    system.L[...] = lattice  # in place, L is a view of S
+    system.T = header['T']   # rebuilds the tables (and empty statistics)
+    system.obs.set_state(header['obs'])
+    for name, value in header['scalars'].items():
+        setattr(system, name, value)
+    system.rng.set_state(header['rng'])
+    for name, obj in (extra or {}).items():
+        saved = header.get('extra', {})
+        if name not in saved:
+            raise ValueError('Checkpoint {} has no saved {}'.format(path, name))
+        obj.set_state(saved[name])
+    return system
+
+
+class Checkpointer():
+    def __init__(self, system, path, interval=600, extra=None):
+        self.system = system
+        self.path = path
+        self.extra = extra  # name: object saved along with the system
+        self.interval = interval  # wall clock seconds between checkpoints
+        self.last = time.perf_counter()
+        self.thread = None
+        self.error = None  # exception raised by the last background write
+        self.saves = 0
+
+    def _write(self, header, lattice):
+        try:
+            write(self.path, header, lattice)
+        except Exception as e:
+            self.error = e
+
+    def check(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def save(self, wait=False):
+        # Snapshot now, write in the background
+        self.check()
+        if self.thread is not None:
+            self.thread.join()
+        self.thread = threading.Thread(target=self._write, args=state(self.system, self.extra), daemon=True)
+        self.thread.start()
+        self.last = time.perf_counter()
+        self.saves += 1
+        if wait:
+            self.close()
+
+    def update(self):
+        # Call between chunks of work, True when a checkpoint was started
+        self.check()
+        if time.perf_counter() - self.last < self.interval:
+            return False
+        if self.thread is not None and self.thread.is_alive():
+            return False  # the disk is slower than the interval, skip rather than stall
+        self.save()
+        return True
+
+    def close(self):
+        # Wait for the last write to finish
+        if self.thread is not None:
+            self.thread.join()
+        self.check()
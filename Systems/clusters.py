@@ -0,0 +1,37 @@
+import numpy as np
+
+'''
+Array based connected component labelling for cluster algorithms.
+
+Sites are 0...N-1 and the active bonds are given as two arrays a, b (bond k joins a[k] and b[k]).
+label_clusters() is a union-find done on whole arrays: every round each bond that still joins two different
+roots hooks the larger root onto the smaller one, then pointer jumping compresses every path so each site
+points straight at its root. Labels only ever decrease, so no cycles can form, and a round costs a few
+vectorized passes over the remaining bonds instead of a python loop over sites.
+'''
+
+
+def compress(parent):
+    # Pointer jumping until every site points at a root
+    while True:
+        grand = parent[parent]
+        if np.array_equal(grand, parent):
+            return parent
+        parent = grand
+
+
+def label_clusters(N, a, b):
+    # Root (smallest site index) of the cluster of every site
+    parent = np.arange(N)
+    a, b = np.asarray(a), np.asarray(b)
+    while len(a):
+        parent = compress(parent)
+        ra, rb = parent[a], parent[b]
+        cross = ra != rb
+        if not cross.any():
+            break
+
+        # Bonds already inside one cluster stay that way, only keep the ones still joining two roots
+        a, b, ra, rb = a[cross], b[cross], ra[cross], rb[cross]
+        np.minimum.at(parent, np.maximum(ra, rb), np.minimum(ra, rb))
+    return compress(parent)
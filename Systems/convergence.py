@@ -0,0 +1,100 @@
+import numpy as np
+
+from Systems.observables import Accumulator, Observables
+
+'''
+Automatic burn-in and stopping for a run, so easy temperatures don't use the budget of hard ones.
+
+Convergence watches a system through its measurements (one update() after every system.measure()):
+
+burn-in     e = E/N and m = |B| are averaged over consecutive windows of `window` measurements. The chain is
+            taken as equilibrated once two consecutive windows agree within z combined (binning) error bars
+            for both, i.e. the drift from the starting state is below the noise. The burn-in measurements
+            are then dropped by giving the system fresh Observables.
+sampling    update() returns False once the targets are met: at least target_samples effectively independent
+            samples (n / (2 tau) of the worse of E and |M|) and/or both error bars at most target_error.
+
+It fits the Scheduler directly, the work function just returns convergence.update():
+    convergence = Convergence(system, target_samples=1000)
+    def work():
+        system.sweep()
+        system.measure()
+        return convergence.update()
+'''
+
+
+class Convergence():
+    window = 256        # measurements per burn-in window
+    z = 2               # windows agreeing within z error bars count as equilibrated
+    min_samples = 1024  # measurements needed before tau (and so the stop criteria) is trusted
+
+    def __init__(self, system, target_samples=None, target_error=None, window=None):
+        if target_samples is None and target_error is None:
+            raise ValueError('Convergence needs a target_samples and/or target_error to stop at')
+        self.system = system
+        self.target_samples = target_samples
+        self.target_error = target_error
+        if window is not None:
+            self.window = window
+
+        self.equilibrated = False
+        self.burn_in = 0     # measurements thrown away
+        self.previous = None  # the last full window, (e, m) accumulators
+        self.current = (Accumulator(), Accumulator())
+
+    def get_state(self):
+        # Burn-in progress, for checkpoints (Systems/checkpoint.py)
+        return {'equilibrated': self.equilibrated, 'burn_in': self.burn_in,
+                'previous': None if self.previous is None else [a.get_state() for a in self.previous],
+                'current': [a.get_state() for a in self.current]}
+
+    def set_state(self, state):
+        self.equilibrated = state['equilibrated']
+        self.burn_in = state['burn_in']
+        self.previous = None
+        if state['previous'] is not None:
+            self.previous = (Accumulator(), Accumulator())
+            for a, saved in zip(self.previous, state['previous']):
+                a.set_state(saved)
+        self.current = (Accumulator(), Accumulator())
+        for a, saved in zip(self.current, state['current']):
+            a.set_state(saved)
+
+    def agree(self, a, b):
+        # Window means within z combined error bars
+        return abs(a.mean - b.mean) <= self.z * np.sqrt(a.error()**2 + b.error()**2)
+
+    def update(self):
+        # Call after each system.measure(), False once the targets are met
+        if not self.equilibrated:
+            self.burn_in += 1
+            e, m = self.current
+            e.add(self.system.E / self.system.obs.N)
+            m.add(abs(self.system.B))
+            if e.n == self.window:
+                if self.previous is not None and all(map(self.agree, self.previous, self.current)):
+                    self.equilibrated = True
+                    self.system.obs = Observables(self.system.obs.N)
+                else:
+                    self.previous, self.current = self.current, (Accumulator(), Accumulator())
+            return True
+        return not self.converged()
+
+    def effective_samples(self):
+        obs = self.system.obs
+        return min(obs['E'].effective_samples(), obs['M'].effective_samples())
+
+    def converged(self):
+        obs = self.system.obs
+        if not self.equilibrated or obs.n < self.min_samples:
+            return False
+        if self.target_samples is not None and self.effective_samples() < self.target_samples:
+            return False
+        if self.target_error is not None and max(obs['E'].error(), obs['M'].error()) > self.target_error:
+            return False
+        return True
+
+    def report(self):
+        obs = self.system.obs
+        return 'Burn-in: {} | Samples: {} | tau_E = {:.2f}, tau_M = {:.2f} | Effective samples: {:.0f}'.format(
+            self.burn_in, obs.n, obs['E'].tau(), obs['M'].tau(), self.effective_samples())
@@ -0,0 +1,115 @@
+import numpy as np
+
+from Systems import lattice
+
+'''
+Incremental histogram of the local energy classes for the Energy Bias samplers (Implementatios/*EnergyBias.py,
+1DBruteForce.py, Functions.py).
+
+Those samplers steer the fraction of sites in each local energy class E_k = -J s_k (sum of neighbours) towards a
+target distribution pi. Re-classifying the whole lattice after every tentative flip is O(N); a flip of site k
+only changes the class of k and of the sites that have k as a neighbour, so the counts are updated for those
+few sites and the squared distance to N pi is kept as a running sum, both O(1) per proposal.
+
+Classes are numbered from the lowest energy up: class (z - s_k nb_k) / 2 for z neighbours, i.e.
+    chain       0: -2J, 1: 0, 2: 2J
+    square      0: -4J, 1: -2J, 2: 0, 3: 2J, 4: 4J
+Edges are reflecting, as in the samplers: a missing neighbour is replaced by the opposite one, so every site
+has z neighbours (an end of the chain sees its only neighbour twice).
+
+usage:
+    classes = EnergyClasses(L.reshape(-1), square(n), pi)     # the spins are flipped in place, L stays a view
+    a = classes.flip(k)                                       # distance to pi after flipping k
+    if a >= before: classes.flip(k)                           # undo, O(1) as well
+'''
+
+
+def reflecting(nbr, opposite):
+    # Replace the sentinel of a missing neighbour by the neighbour in the opposite direction
+    N = len(nbr)
+    table = nbr.copy()
+    for d, o in enumerate(opposite):
+        missing = nbr[:, d] == N
+        table[missing, d] = nbr[missing, o]
+    return table
+
+
+def chain(n):
+    return reflecting(lattice.chain(n), (1, 0))
+
+
+def square(n, m=None):
+    return reflecting(lattice.square(n, n if m is None else m), (1, 0, 3, 2))
+
+
+class EnergyClasses():
+    def __init__(self, S, nbr, pi=None, J=1):
+        # S: the N spins (flat, flipped in place), nbr: reflecting neighbour table, pi: target class fractions
+        self.S = S
+        self.N, self.z = nbr.shape
+        self.J = J
+        self.nbr = nbr.tolist()
+
+        # affected[k]: k and every site with k among its neighbours, the classes a flip of k can change
+        affected = [{k} for k in range(self.N)]
+        for x, row in enumerate(self.nbr):
+            for k in row:
+                affected[k].add(x)
+        self.affected = [tuple(a) for a in affected]
+
+        nb = np.sum(S[nbr], axis=1)
+        self.c = ((self.z - S[:self.N] * nb) // 2).tolist()
+        self.counts = np.bincount(self.c, minlength=self.z + 1).tolist()
+        self.target = pi
+
+    @property
+    def target(self):
+        return self.pi
+
+    @target.setter
+    def target(self, pi):
+        # pi in class order, the running sum of (count - N pi)^2 starts over
+        self.pi = None if pi is None else np.asarray(pi, dtype=float)
+        if pi is not None:
+            self.goal = (self.N * self.pi).tolist()
+            self.sq = sum((c - g)**2 for c, g in zip(self.counts, self.goal))
+
+    def field(self, k):
+        S = self.S
+        return sum(S[x] for x in self.nbr[k])
+
+    def energy(self, k):
+        # Local energy of site k
+        return -self.J * self.S[k] * self.field(k)
+
+    def site_class(self, k):
+        return (self.z - self.S[k] * self.field(k)) // 2
+
+    def fractions(self):
+        return np.array(self.counts) / self.N
+
+    def distance(self):
+        # |fractions - pi|
+        return np.sqrt(max(self.sq, 0)) / self.N
+
+    def move(self, i, d):
+        # Add d to the count of class i
+        self.sq += 2 * d * (self.counts[i] - self.goal[i]) + d * d
+        self.counts[i] += d
+
+    def flip(self, k):
+        # Flip spin k, update the classes around it and return the new distance (None without a target)
+        self.S[k] = -self.S[k]
+        c, counts = self.c, self.counts
+        for x in self.affected[k]:
+            new = self.site_class(x)
+            old = c[x]
+            if new != old:
+                if self.pi is None:
+                    counts[old] -= 1
+                    counts[new] += 1
+                else:
+                    self.move(old, -1)
+                    self.move(new, 1)
+                c[x] = new
+        return None if self.pi is None else self.distance()
@@ -0,0 +1,176 @@
+import math
+import weakref
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+'''
+Compiled kernels for sequential single-spin dynamics (Metropolis, and the Wang-Landau walk) and Wolff cluster growth.
+
+Checkerboard sweeps change the order in which spins are updated, which is fine for equilibrium averages but
+not for kinetics. These kernels keep the exact dynamics of step(): one random site per proposal, accepted
+with the tabulated min(1, exp(-b*dE)), but run a whole block of proposals in one loop. The lattice only enters
+through its neighbour table (Systems.lattice), so the same kernel serves the chain and the square lattice
+with any boundary condition.
+
+Backends:
+    'numba' - the loops are compiled with numba in nopython mode (used by default when numba is installed)
+    'numpy' - the same loops run as python over pre-drawn numpy arrays converted to lists
+
+The random numbers are drawn by the caller so both backends give identical trajectories for the same draws.
+'''
+
+backend = 'numba' if numba is not None else 'numpy'
+
+
+def set_backend(name):
+    global backend
+    if name not in ('numba', 'numpy'):
+        raise ValueError('Unknown kernel backend: {}'.format(name))
+    if name == 'numba' and numba is None:
+        raise ImportError('The numba backend needs numba to be installed')
+    backend = name
+
+
+def jit(f):
+    # Compiled version of f, or None when numba is missing
+    if numba is None:
+        return None
+    return numba.njit(cache=True)(f)
+
+
+# Python lists of the neighbour tables (and the Wolff work arrays) for the numpy backend, converted once per
+# array. The cache only holds a weak reference to the array and its entry goes with it, so short-lived systems
+# don't pile up here
+_lists = {}
+
+
+def as_list(a):
+    cached = _lists.get(id(a))
+    if cached is None or cached[0]() is not a:
+        cached = _lists[id(a)] = (weakref.ref(a), a.tolist())
+        weakref.finalize(a, _lists.pop, id(a), None)
+    return cached[1]
+
+
+def _metropolis(S, nbr, N, E, B, acceptance, dEs, sites, uniforms):
+    # S holds the N spins plus the sentinel S[N] = 0 that missing neighbours point at
+    z = len(acceptance) // 2  # s * (sum of neighbours) ranges over -z...z
+    sE, sB, accepted = 0.0, 0.0, 0
+    for t in range(len(sites)):
+        sE += E
+        sB += B
+
+        k = sites[t]
+        nb = 0
+        for x in nbr[k]:
+            nb += S[x]
+
+        a = S[k] * nb + z  # index into the acceptance table
+        p = acceptance[a]
+        if p >= 1 or uniforms[t] <= p:
+            S[k] = -S[k]
+            E += dEs[a]
+            B += 2 * S[k] / N
+            accepted += 1
+    return E, B, sE, sB, accepted
+
+
+_metropolis_jit = jit(_metropolis)
+
+
+def metropolis(S, nbr, E, B, acceptance, dEs, sites, uniforms):
+    # Run len(sites) proposals on the spins S (with sentinel) and neighbour table nbr (Systems.lattice), in place.
+    # Returns (S, E, B, sum of E, sum of B, accepted), the sums are taken before each proposal like step()
+    N = len(nbr)
+    if backend == 'numba':
+        E, B, sE, sB, accepted = _metropolis_jit(S, nbr, N, E, B, acceptance, dEs, sites, uniforms)
+    else:
+        flat = S.tolist()
+        E, B, sE, sB, accepted = _metropolis(flat, as_list(nbr), N, E, B, acceptance.tolist(), dEs.tolist(),
+                                             sites.tolist(), uniforms.tolist())
+        S[:] = flat
+    return S, E, B, sE, sB, accepted
+
+
+def _wang_landau(S, nbr, level, ln_g, H, ln_f, sites, uniforms):
+    # level indexes ln_g and H, flipping s with neighbour sum nb moves it by s * nb (dE = 2J s nb)
+    accepted = 0
+    for t in range(len(sites)):
+        k = sites[t]
+        nb = 0
+        for x in nbr[k]:
+            nb += S[x]
+
+        new = level + S[k] * nb
+        d = ln_g[level] - ln_g[new]
+        if d >= 0 or uniforms[t] < math.exp(d):
+            S[k] = -S[k]
+            level = new
+            accepted += 1
+        ln_g[level] += ln_f
+        H[level] += 1
+    return level, accepted
+
+
+_wang_landau_jit = jit(_wang_landau)
+
+
+def wang_landau(S, nbr, level, ln_g, H, ln_f, sites, uniforms):
+    # Run len(sites) Wang-Landau proposals in place on S, ln_g and H. Returns (level, accepted)
+    if backend == 'numba':
+        return _wang_landau_jit(S, nbr, level, ln_g, H, ln_f, sites, uniforms)
+    flat, g, h = S.tolist(), ln_g.tolist(), H.tolist()
+    level, accepted = _wang_landau(flat, as_list(nbr), level, g, h, ln_f, sites.tolist(), uniforms.tolist())
+    S[:], ln_g[:], H[:] = flat, g, h
+    return level, accepted
+
+
+def _wolff(S, nbr, seed, p_add, uniforms, visited, stack):
+    # Grow the cluster of seed with an explicit stack (stack[:size] are its sites, visited marks them) and flip it.
+    # Every aligned unvisited neighbour takes the next uniform, if they run out nothing is changed and size is -1
+    s = S[seed]
+    visited[seed] = 1
+    stack[0] = seed
+    size, head, used = 1, 0, 0
+    while head < size:
+        k = stack[head]
+        head += 1
+        for x in nbr[k]:
+            if visited[x] == 0 and S[x] == s:
+                if used == len(uniforms):
+                    for t in range(size):
+                        visited[stack[t]] = 0
+                    return -1, 0, used
+                if uniforms[used] < p_add:
+                    visited[x] = 1
+                    stack[size] = x
+                    size += 1
+                used += 1
+
+    # Only bonds crossing the cluster boundary change sign (the sentinel adds 0)
+    mutot = 0
+    for t in range(size):
+        for x in nbr[stack[t]]:
+            if visited[x] == 0:
+                mutot += S[x]
+    for t in range(size):
+        S[stack[t]] = -s
+        visited[stack[t]] = 0
+    return size, mutot, used
+
+
+_wolff_jit = jit(_wolff)
+
+
+def wolff(S, nbr, seed, p_add, uniforms, visited, stack):
+    # One Wolff cluster flip in place on S. visited (N + 1 zeros, left zeroed) and stack (N) are work arrays.
+    # Returns (cluster size, sum of the spins just outside it before the flip, uniforms used), size -1 when
+    # the uniforms ran out before the cluster was complete (S untouched, call again with more of them)
+    if backend == 'numba':
+        return _wolff_jit(S, nbr, seed, p_add, uniforms, visited, stack)
+    # A cluster may be a few sites, so nothing of size N is copied: S is read and its flipped sites written in
+    # place through a memoryview, and the work arrays are kept as lists per system (_wolff leaves visited zeroed)
+    return _wolff(memoryview(S), as_list(nbr), seed, p_add, uniforms.tolist(), as_list(visited), as_list(stack))
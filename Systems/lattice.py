@@ -0,0 +1,240 @@
+import numpy as np
+
+'''
+Neighbour tables and whole-lattice observables for the chain, the square, cubic, triangular and honeycomb lattices.
+
+Sites are flat indices k (k = i*m + j on an n x m lattice, (i*m + j)*l + h on n x m x l). nbr[k] lists the
+neighbours of site k, a fixed width table of z columns built once; a missing neighbour (open boundaries)
+points at the sentinel index N. The systems keep their spins in an array S of length N + 1 whose last entry
+stays 0, so the local field of any site is S[nbr[k]].sum() with no branches, and S[nbr[sites]].sum(axis=1)
+gathers the fields of many sites at once whatever the geometry.
+
+geometries (z neighbours):
+    chain       2   [previous, next]
+    square      4   [up, down, left, right]
+    cubic       6   [up, down, left, right, back (h-1), front (h+1)]
+    triangular  6   the square lattice plus one diagonal [.., up-right (i-1, j+1), down-left (i+1, j-1)]
+    honeycomb   3   brick wall: [left, right, vertical], the vertical bond goes down from sites with i+j even
+                    and up from sites with i+j odd
+
+boundary:
+    'open'      edge sites have fewer neighbours (the sentinel)
+    'periodic'  rows and columns wrap around (a torus)
+    'helical'   the sites form one long chain k -> k+1, with k +- m the sites above and below, all mod N
+                (the chain is the same as periodic, the honeycomb has no helical form)
+'''
+
+boundaries = ('open', 'periodic', 'helical')
+
+
+def check_boundary(boundary):
+    if boundary not in boundaries:
+        raise ValueError('Unknown boundary condition: {}, expected one of {}'.format(boundary, boundaries))
+
+
+def chain(n, boundary='open'):
+    # (n, 2) table of [previous, next]
+    check_boundary(boundary)
+    k = np.arange(n)
+    if boundary == 'open':
+        prev = np.where(k > 0, k - 1, n)
+        next = np.where(k < n - 1, k + 1, n)
+    else:
+        prev, next = (k - 1) % n, (k + 1) % n
+    return np.stack((prev, next), axis=1)
+
+
+def square(n, m, boundary='open'):
+    # (n*m, 4) table of [up (i-1), down (i+1), left (j-1), right (j+1)]
+    check_boundary(boundary)
+    N = n * m
+    k = np.arange(N)
+    i, j = k // m, k % m
+    if boundary == 'open':
+        up = np.where(i > 0, k - m, N)
+        down = np.where(i < n - 1, k + m, N)
+        left = np.where(j > 0, k - 1, N)
+        right = np.where(j < m - 1, k + 1, N)
+    elif boundary == 'periodic':
+        up = ((i - 1) % n) * m + j
+        down = ((i + 1) % n) * m + j
+        left = i * m + (j - 1) % m
+        right = i * m + (j + 1) % m
+    else:
+        up, down = (k - m) % N, (k + m) % N
+        left, right = (k - 1) % N, (k + 1) % N
+    return np.stack((up, down, left, right), axis=1)
+
+
+def cubic(n, m, l, boundary='open'):
+    # (n*m*l, 6) table of [up (i-1), down (i+1), left (j-1), right (j+1), back (h-1), front (h+1)]
+    check_boundary(boundary)
+    N = n * m * l
+    k = np.arange(N)
+    i, j, h = k // (m * l), (k // l) % m, k % l
+    if boundary == 'open':
+        up = np.where(i > 0, k - m * l, N)
+        down = np.where(i < n - 1, k + m * l, N)
+        left = np.where(j > 0, k - l, N)
+        right = np.where(j < m - 1, k + l, N)
+        back = np.where(h > 0, k - 1, N)
+        front = np.where(h < l - 1, k + 1, N)
+    elif boundary == 'periodic':
+        up = (((i - 1) % n) * m + j) * l + h
+        down = (((i + 1) % n) * m + j) * l + h
+        left = (i * m + (j - 1) % m) * l + h
+        right = (i * m + (j + 1) % m) * l + h
+        back = (i * m + j) * l + (h - 1) % l
+        front = (i * m + j) * l + (h + 1) % l
+    else:
+        up, down = (k - m * l) % N, (k + m * l) % N
+        left, right = (k - l) % N, (k + l) % N
+        back, front = (k - 1) % N, (k + 1) % N
+    return np.stack((up, down, left, right, back, front), axis=1)
+
+
+def triangular(n, m, boundary='open'):
+    # (n*m, 6) table of the square neighbours plus [up-right (i-1, j+1), down-left (i+1, j-1)]
+    check_boundary(boundary)
+    N = n * m
+    k = np.arange(N)
+    i, j = k // m, k % m
+    if boundary == 'open':
+        up_right = np.where((i > 0) & (j < m - 1), k - m + 1, N)
+        down_left = np.where((i < n - 1) & (j > 0), k + m - 1, N)
+    elif boundary == 'periodic':
+        up_right = ((i - 1) % n) * m + (j + 1) % m
+        down_left = ((i + 1) % n) * m + (j - 1) % m
+    else:
+        up_right, down_left = (k - m + 1) % N, (k + m - 1) % N
+    return np.concatenate((square(n, m, boundary), np.stack((up_right, down_left), axis=1)), axis=1)
+
+
+def honeycomb(n, m, boundary='open'):
+    # (n*m, 3) table of [left, right, vertical], a brick wall of n rows
+    check_boundary(boundary)
+    if boundary == 'helical':
+        raise ValueError('The honeycomb lattice has no helical boundary')
+    if boundary == 'periodic' and n % 2:
+        raise ValueError('A periodic honeycomb needs an even number of rows, got {}'.format(n))
+    N = n * m
+    k = np.arange(N)
+    i, j = k // m, k % m
+    table = square(n, m, boundary)
+    down = (i + j) % 2 == 0
+    vertical = np.where(down, table[:, 1], table[:, 0])
+    return np.stack((table[:, 2], table[:, 3], vertical), axis=1)
+
+
+# name: (table builder taking the lattice size and the boundary, neighbours per site, dimensions)
+geometries = {
+    'chain':        (chain, 2, 1),
+    'square':       (square, 4, 2),
+    'cubic':        (cubic, 6, 3),
+    'triangular':   (triangular, 6, 2),
+    'honeycomb':    (honeycomb, 3, 2),
+}
+
+
+def neighbours(geometry, size, boundary='open'):
+    # Neighbour table of any geometry, size a tuple of as many lengths as it has dimensions
+    if geometry not in geometries:
+        raise ValueError('Unknown geometry: {}, expected one of {}'.format(geometry, tuple(geometries)))
+    build, _, dims = geometries[geometry]
+    if len(size) != dims:
+        raise ValueError('A {} lattice needs {} lengths, got {}'.format(geometry, dims, size))
+    return build(*size, boundary)
+
+
+def bonds(nbr, forward):
+    # Every bond once as two arrays of sites, taken from the forward columns of the table (e.g. down and right)
+    N = len(nbr)
+    a = np.concatenate([np.arange(N)] * len(forward))
+    b = np.concatenate([nbr[:, d] for d in forward])
+    keep = b < N
+    return a[keep], b[keep]
+
+
+def all_bonds(nbr):
+    # Every bond once for any table: each bond is listed from both of its ends, keep the one from the lower site
+    # (a bond listed twice, like both bonds of a periodic length 2, is kept twice)
+    N, z = nbr.shape
+    a = np.repeat(np.arange(N), z)
+    b = nbr.reshape(-1)
+    keep = a < b
+    keep &= b < N
+    return a[keep], b[keep]
+
+
+def patterns(geometry, size):
+    # The usual colourings of the geometry, candidates for colouring(): by site coordinates (the triangular
+    # lattice by (i - j) mod 3, the rest by parity), then by flat index parity (helical boundaries with odd
+    # rows). Periodic boundaries need lengths the pattern fits (even, or 3 | n, m)
+    coords = np.indices(size).reshape(len(size), -1)
+    if geometry == 'triangular':
+        return [(coords[0] - coords[1]) % 3]
+    return [coords.sum(axis=0) % 2, np.arange(coords.shape[1]) % 2]
+
+
+def colouring(nbr, candidates=(), greedy=True):
+    # Sites of one colour are never neighbours, so each colour class can be updated at once. The first candidate
+    # (array of colours per site) that is valid for the table, else a greedy colouring in site order (or None
+    # without greedy). A list of site index arrays, one per colour
+    N = len(nbr)
+    inside = nbr < N
+    for colour in candidates:
+        c = np.append(colour, -1)  # the sentinel gets its own colour
+        if not np.any(inside & (c[nbr] == colour[:, None])):
+            return [np.flatnonzero(colour == c) for c in range(colour.max() + 1)]
+    if not greedy:
+        return None
+
+    colour = [-1] * (N + 1)
+    for k, row in enumerate(nbr.tolist()):
+        used = {colour[x] for x in row}
+        c = 0
+        while c in used:
+            c += 1
+        colour[k] = c
+    colour = np.array(colour[:N])
+    return [np.flatnonzero(colour == c) for c in range(colour.max() + 1)]
+
+
+def sublattices(nbr, candidates):
+    # The first two-colour candidate (array of 0/1 per site) where no bond joins two sites of the same colour,
+    # as a pair of site index arrays, or None if the lattice is not two-coloured by any of them
+    classes = colouring(nbr, [colour for colour in candidates if colour.max() <= 1], greedy=False)
+    return None if classes is None else tuple(classes)
+
+
+def chain_energy(L, J=1, boundary='open'):
+    # -J * sum over bonds of s_i s_i+1
+    check_boundary(boundary)
+    Ei = np.sum(L[:-1] * L[1:])
+    if boundary != 'open':
+        Ei += L[-1] * L[0]
+    return -J * Ei
+
+
+def square_energy(L, J=1, boundary='open'):
+    # -J * sum over bonds, each site with its down and right neighbour
+    check_boundary(boundary)
+    if boundary == 'open':
+        Ei = np.sum(L[:-1, :] * L[1:, :]) + np.sum(L[:, :-1] * L[:, 1:])
+    elif boundary == 'periodic':
+        Ei = np.sum(L * np.roll(L, -1, axis=0)) + np.sum(L * np.roll(L, -1, axis=1))
+    else:
+        flat = L.reshape(-1)
+        Ei = np.sum(flat * np.roll(flat, -L.shape[1])) + np.sum(flat * np.roll(flat, -1))
+    return -J * Ei
+
+
+def energy(S, nbr, J=1):
+    # -J * sum over bonds for any table, every bond is seen from both ends (S with the sentinel)
+    N = len(nbr)
+    return -J * (np.sum(S[:N] * S[nbr].sum(axis=1)) // 2)
+
+
+def magnetisation(L):
+    # Mean spin
+    return np.sum(L) / L.size
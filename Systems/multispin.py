@@ -0,0 +1,170 @@
+import numpy as np
+
+'''
+Multi-spin coded 2D Ising lattice, 64 spins per uint64 word.
+
+Bit b of word w in row i holds spin (i, 64*w + b), a set bit is a +1 spin. Boundaries are periodic, so the
+lattice needs an even number of rows and a multiple of 64 columns for the checkerboard to close on itself.
+
+algorithm outline (one half of a checkerboard sweep):
+For every site, XOR with each of its 4 neighbours gives 4 words of anti-aligned bits a1..a4.
+A bit-sliced adder turns them into masks for A = number of anti-aligned neighbours (0...4).
+Flipping a spin with A anti-aligned neighbours costs dE = 2J * (4 - 2A), accepted with probability
+min(1, exp(-b*dE)). For each A this is a per-bit random mask with bits set independently with that
+probability, so all 64 spins of a word are accepted or rejected in a handful of bitwise operations.
+
+usage:
+    lattice = PackedLattice.from_spins(L, T)   # L is a +-1 array like System.L
+    lattice.sweep()
+    L = lattice.spins()                         # back to +-1 for redraw() and the observables
+'''
+
+ONES = np.uint64(0xFFFFFFFFFFFFFFFF)
+EVEN = np.uint64(0x5555555555555555)  # bits 0, 2, 4, ... (even columns)
+ODD = np.uint64(0xAAAAAAAAAAAAAAAA)   # bits 1, 3, 5, ... (odd columns)
+
+
+def pack(L):
+    # +-1 array of shape (n, m) -> uint64 array of shape (n, m // 64)
+    n, m = L.shape
+    if m % 64:
+        raise ValueError('The number of columns must be a multiple of 64, got {}'.format(m))
+    bits = np.packbits(L > 0, axis=1, bitorder='little')
+    return np.ascontiguousarray(bits).view('<u8').astype(np.uint64)
+
+
+def unpack(S):
+    # uint64 array of shape (n, w) -> +-1 array of shape (n, 64 * w)
+    bits = np.unpackbits(np.ascontiguousarray(S, dtype='<u8').view(np.uint8), axis=1, bitorder='little')
+    return bits.astype(np.int64) * 2 - 1
+
+
+def popcount(x):
+    # Total number of set bits in an array of uint64 words
+    if hasattr(np, 'bitwise_count'):
+        return int(np.sum(np.bitwise_count(x)))
+    return int(np.sum(np.unpackbits(np.ascontiguousarray(x).view(np.uint8))))
+
+
+class PackedLattice():
+    bits = 32  # binary digits of each acceptance probability used by the random masks
+
+    def __init__(self, S, T, J=1, seed=None):
+        self.S = np.ascontiguousarray(S, dtype=np.uint64)
+        self.n, self.w = self.S.shape
+        self.m = 64 * self.w
+        self.size = (self.n, self.m)
+        self.N = self.n * self.m
+        if self.n % 2:
+            raise ValueError('The number of rows must be even for a periodic checkerboard, got {}'.format(self.n))
+
+        self.J = J
+        self.generator = np.random.default_rng(seed)
+
+        # Checkerboard colour masks, colour 0 is (i + j) even
+        even_rows = (np.arange(self.n) % 2 == 0)[:, None]
+        self.sublattices = (np.where(even_rows, EVEN, ODD), np.where(even_rows, ODD, EVEN))
+
+        self.E = self.get_Ei()
+        self.B = self.get_B()
+        self.sE = 0
+        self.sB = 0
+        self.ns = 0
+        self.flips = 0  # spins flipped so far
+
+        # Temperature, setting it (re)builds the acceptance table
+        self.T = T
+
+    @classmethod
+    def from_spins(cls, L, T, J=1, seed=None):
+        return cls(pack(L), T, J, seed)
+
+    def spins(self):
+        return unpack(self.S)
+
+    @property
+    def T(self):
+        return self._T
+
+    @T.setter
+    def T(self, T):
+        self._T = T
+        self.b = 1/T
+
+        # dE and min(1, exp(-b*dE)) indexed by the number of anti-aligned neighbours A
+        A = np.arange(5)
+        self.dEs = 2 * self.J * (4 - 2 * A)
+        self.acceptance = np.minimum(1, np.exp(-self.b * self.dEs))
+
+    def neighbours(self):
+        # Words holding the up, down, left and right neighbour of every bit (periodic)
+        S = self.S
+        one, last = np.uint64(1), np.uint64(63)
+        up = np.roll(S, 1, axis=0)
+        down = np.roll(S, -1, axis=0)
+        left = (S << one) | (np.roll(S, 1, axis=1) >> last)
+        right = (S >> one) | (np.roll(S, -1, axis=1) << last)
+        return up, down, left, right
+
+    def get_Ei(self):
+        # Every bond once: each site with its down and right neighbour, anti-aligned bonds cost +J
+        _, down, _, right = self.neighbours()
+        anti = popcount(self.S ^ down) + popcount(self.S ^ right)
+        return -self.J * (2 * self.N - 2 * anti)
+
+    def get_B(self):
+        return (2 * popcount(self.S) - self.N) / self.N
+
+    def random_mask(self, p):
+        # Words whose bits are independently set with probability p, by comparing the binary expansion of p
+        # against a random binary fraction bit-slice by bit-slice (most significant first)
+        shape = self.S.shape
+        if p >= 1:
+            return np.full(shape, ONES)
+        below = np.zeros(shape, dtype=np.uint64)  # random fraction already known to be < p
+        equal = np.full(shape, ONES)              # random fraction still equal to p so far
+        for _ in range(self.bits):
+            p *= 2
+            r = self.generator.bit_generator.random_raw(shape).astype(np.uint64, copy=False)
+            if p >= 1:
+                p -= 1
+                below |= equal & ~r
+                equal &= r
+            else:
+                equal &= ~r
+        return below
+
+    def counts(self):
+        # Masks for A = 0...4 anti-aligned neighbours, from a bit-sliced sum of the four XORs
+        a1, a2, a3, a4 = (self.S ^ nb for nb in self.neighbours())
+        s1, c1 = a1 ^ a2, a1 & a2
+        s2, c2 = a3 ^ a4, a3 & a4
+        odd, carry = s1 ^ s2, s1 & s2  # A = odd + 2 * (c1 + c2 + carry), carry excludes c1 and c2
+        twos = c1 | c2 | carry
+        return (~odd & ~twos,
+                odd & ~twos,
+                ~odd & ((c1 ^ c2) | carry),
+                odd & (c1 ^ c2),
+                c1 & c2)
+
+    def sweep(self):
+        # Calculate properties wanted
+        self.sE += self.E
+        self.sB += self.B
+        self.ns += 1
+
+        for sublattice in self.sublattices:
+            flip = np.zeros_like(self.S)
+            classes = self.counts()
+            for A, mask in enumerate(classes):
+                p = self.acceptance[A]
+                if p > 0:
+                    flip |= mask & self.random_mask(p)
+            flip &= sublattice
+
+            # Energy change per class and magnetisation change from the flipped +1 (down) and -1 (up) spins
+            self.E += sum(self.dEs[A] * popcount(flip & mask) for A, mask in enumerate(classes))
+            flipped, flipped_up = popcount(flip), popcount(flip & self.S)
+            self.B += 2 * (flipped - 2 * flipped_up) / self.N
+            self.flips += flipped
+            self.S ^= flip
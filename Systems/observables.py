@@ -0,0 +1,159 @@
+import numpy as np
+
+'''
+Streaming accumulators for the observables of a run, error bars without storing the time series.
+
+Accumulator keeps the count, mean and sum of squared deviations of a stream of numbers with Welford's update,
+which stays accurate where sum(x^2)/n - mean^2 cancels catastrophically (e.g. E^2 of a large ordered lattice).
+
+Successive samples of a Markov chain are correlated, so var/n underestimates the error of the mean. For the
+binning analysis every sample is also fed into a ladder of levels: level l sees the means of consecutive
+blocks of 2^l samples, each with its own Welford statistics. Once the blocks are longer than the
+autocorrelation time they are independent and the naive error of level l reaches a plateau, the true error.
+The ratio of the plateau to the naive error gives the integrated autocorrelation time,
+tau = (error / naive error)^2 / 2, in units of measurements, and n / (2 tau) effectively independent samples.
+Only one pending block per level is kept, so memory is O(log(samples)) numbers per observable.
+
+Observables tracks e = E/N, e^2, m = |B|, m^2 and m^4 per sample (one call of add() per measurement, e.g.
+after each sweep) and derives:
+    specific heat       C = b^2 * N * var(e)
+    susceptibility      chi = b * N * var(m)
+    Binder cumulant     U = 1 - <m^4> / (3 <m^2>^2)
+
+usage:
+    obs = Observables(N)
+    obs.add(E, B)
+    obs['E'].mean, obs['E'].error(), obs['E'].tau(), obs.specific_heat(T), obs.binder()
+'''
+
+
+class Accumulator():
+    min_bins = 32  # levels with fewer blocks than this are too noisy to read an error from
+
+    def __init__(self):
+        # Welford statistics per binning level, [0] is the raw stream
+        self.counts = [0]
+        self.means = [0.0]
+        self.M2s = [0.0]
+        self.pending = [None]  # block mean at each level waiting for its partner
+
+    def _update(self, level, x):
+        self.counts[level] += 1
+        d = x - self.means[level]
+        self.means[level] += d / self.counts[level]
+        self.M2s[level] += d * (x - self.means[level])
+
+    def add(self, x):
+        self._update(0, x)
+        level = 0
+        while True:
+            if self.pending[level] is None:
+                self.pending[level] = x
+                return
+            # two blocks of 2^level samples make one block of the next level
+            x = (self.pending[level] + x) / 2
+            self.pending[level] = None
+            level += 1
+            if level == len(self.counts):
+                self.counts.append(0)
+                self.means.append(0.0)
+                self.M2s.append(0.0)
+                self.pending.append(None)
+            self._update(level, x)
+
+    @property
+    def n(self):
+        return self.counts[0]
+
+    @property
+    def mean(self):
+        return self.means[0]
+
+    @property
+    def var(self):
+        # Variance of the samples (not of the mean)
+        return self.M2s[0] / self.n if self.n > 0 else 0.0
+
+    def level_error(self, level):
+        # Naive error of the mean from the blocks of level, treating them as independent
+        c = self.counts[level]
+        if c < 2:
+            return np.nan
+        return np.sqrt(self.M2s[level] / (c - 1) / c)
+
+    def errors(self):
+        # Naive error of every level with enough blocks, the binning curve
+        return [self.level_error(l) for l in range(len(self.counts)) if self.counts[l] >= self.min_bins]
+
+    def error(self):
+        # Error of the mean, the largest error along the binning curve (its plateau once converged)
+        errors = self.errors()
+        if not errors:
+            return self.level_error(0)
+        return max(errors)
+
+    def tau(self):
+        # Integrated autocorrelation time in measurements, 1/2 for uncorrelated samples
+        naive = self.level_error(0)
+        if not naive > 0:
+            return 0.5
+        return 0.5 * (self.error() / naive)**2
+
+    def effective_samples(self):
+        return self.n / (2 * self.tau())
+
+    def get_state(self):
+        return {'counts': list(self.counts), 'means': [float(x) for x in self.means],
+                'M2s': [float(x) for x in self.M2s], 'pending': [None if x is None else float(x) for x in self.pending]}
+
+    def set_state(self, state):
+        self.counts, self.means, self.M2s, self.pending = (list(state[k]) for k in ('counts', 'means', 'M2s', 'pending'))
+
+
+class Observables():
+    names = ('E', 'E2', 'M', 'M2', 'M4')
+
+    def __init__(self, N):
+        self.N = N
+        self.accumulators = {name: Accumulator() for name in self.names}
+
+    def __getitem__(self, name):
+        return self.accumulators[name]
+
+    @property
+    def n(self):
+        return self['E'].n
+
+    def add(self, E, B):
+        # E is the total energy, B the mean spin
+        e, m = E / self.N, abs(B)
+        self['E'].add(e)
+        self['E2'].add(e * e)
+        self['M'].add(m)
+        self['M2'].add(m * m)
+        self['M4'].add(m ** 4)
+
+    def get_state(self):
+        return {name: accumulator.get_state() for name, accumulator in self.accumulators.items()}
+
+    def set_state(self, state):
+        for name, accumulator in self.accumulators.items():
+            accumulator.set_state(state[name])
+
+    def specific_heat(self, T):
+        return self.N * self['E'].var / T**2
+
+    def susceptibility(self, T):
+        return self.N * self['M'].var / T
+
+    def binder(self):
+        M2 = self['M2'].mean
+        if M2 == 0:
+            return np.nan
+        return 1 - self['M4'].mean / (3 * M2**2)
+
+    def summary(self, T):
+        return {'E': self['E'].mean, 'E_err': self['E'].error(),
+                'M': self['M'].mean, 'M_err': self['M'].error(),
+                'tau_E': self['E'].tau(), 'tau_M': self['M'].tau(),
+                'C': self.specific_heat(T), 'chi': self.susceptibility(T), 'U': self.binder()}
@@ -0,0 +1,80 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from Systems.convergence import Convergence
+
+'''
+Temperature sweeps for E(T), |M|(T), specific heat and susceptibility.
+
+Every (lattice size, temperature) point is an independent run of Systems.MCMC_2D.System, so the grid is
+fanned out over a ProcessPoolExecutor with one task per point and no communication between them. Each task
+returns one row of the table, all rows are written to a single csv at the end.
+
+The statistics are streamed into the system's Observables (Systems/observables.py), so a point needs O(1)
+memory however many sweeps it records. With target_samples set, the burn-in is detected and each point stops
+once it has that many effectively independent samples (Systems/convergence.py), sweeps and burn_in then only
+cap the sweeps spent.
+
+Columns (per site quantities, e = E/N and m = |B|):
+    n, T            lattice side and temperature
+    E, E_err, E_var mean, binning error bar and variance of e
+    M, M_err, M_var mean, binning error bar and variance of m
+    C               specific heat per site, b^2 * N * var(e)
+    chi             susceptibility per site, b * N * var(m)
+    U               Binder cumulant, 1 - <m^4> / (3 <m^2>^2)
+    tau_E, tau_M    integrated autocorrelation times in sweeps
+    burn_in         sweeps thrown away
+    samples         sweeps measured
+'''
+
+columns = ('n', 'T', 'E', 'E_err', 'E_var', 'M', 'M_err', 'M_var', 'C', 'chi', 'U', 'tau_E', 'tau_M', 'burn_in',
+           'samples')
+
+
+def simulate(n, T, sweeps, burn_in, cluster_updates, seed, boundary=None, target_samples=None):
+    # One point of the table: burn in, then measure E and |B| after every sweep
+    from Systems.MCMC_2D import System
+
+    system = System(seed=seed, n=n, boundary=boundary)
+    system.T = T
+
+    def sweep():
+        system.sweep()
+        for _ in range(cluster_updates):
+            system.jump()
+
+    if target_samples is None:
+        for t in range(-burn_in, sweeps):
+            sweep()
+            if t >= 0:
+                system.measure()
+    else:
+        convergence = Convergence(system, target_samples)
+        for t in range(burn_in + sweeps):
+            sweep()
+            system.measure()
+            if not convergence.update():
+                break
+        burn_in = convergence.burn_in
+
+    obs = system.obs
+    return (n, T, obs['E'].mean, obs['E'].error(), obs['E'].var, obs['M'].mean, obs['M'].error(), obs['M'].var,
+            obs.specific_heat(T), obs.susceptibility(T), obs.binder(), obs['E'].tau(), obs['M'].tau(), burn_in, obs.n)
+
+
+def run(temperatures, sizes, sweeps=10000, burn_in=1000, cluster_updates=0, path='phase_diagram.csv',
+        workers=None, seed=None, boundary=None, target_samples=None):
+    # boundary is one of Systems.lattice.boundaries, None for the System default
+    points = [(n, T) for n in sizes for T in temperatures]
+    seeds = np.random.SeedSequence(seed).spawn(len(points))
+    workers = os.cpu_count() if workers is None else workers
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(simulate, n, T, sweeps, burn_in, cluster_updates, s, boundary, target_samples) for (n, T), s in zip(points, seeds)]
+        table = np.array([future.result() for future in futures])
+
+    if path is not None:
+        np.savetxt(path, table, fmt='%.8g', delimiter=',', header=','.join(columns), comments='')
+    return table
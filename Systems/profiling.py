@@ -0,0 +1,105 @@
+import json
+import time
+from collections import defaultdict
+
+'''
+Per-phase wall time instrumentation for a running system.
+
+Profiler.attach() shadows the methods being timed (step, sweep, run, jump, reset_cache, redraw and the
+renderer's poll) with timed wrappers set on the instance. Nothing is wrapped until then and detach() removes
+the wrappers again, so a run without a profiler executes exactly the same code as before.
+
+Every call adds to the wall time and call count of its phase. The local moves (step, sweep, run) also count
+their proposals and the flips they made, giving flips/s and the acceptance rate. An epoch ends when
+reset_cache() returns: the epoch's numbers are kept in profiler.latest (the HUD shows them), written as one
+JSON line to the stream, and the counters start again.
+
+usage:
+    profiler = Profiler()               # JSON lines to stdout, or Profiler(open('profile.jsonl', 'w'))
+    profiler.attach(system, renderer)
+    ...
+    profiler.detach()
+
+JSON line:
+    {"epoch": 12, "wall": 0.031, "flips_per_s": ..., "acceptance": ..., "E": ..., "B": ...,
+     "phases": {"sweep": {"calls": 1, "time": 0.02}, ...}}
+'''
+
+
+class Profiler():
+    methods = ('step', 'sweep', 'run', 'jump', 'reset_cache', 'redraw')
+    local = ('step', 'sweep', 'run')  # the phases acceptance is measured over
+
+    def __init__(self, stream=None, emit=True):
+        self.stream = stream  # None for stdout
+        self.emit = emit      # write a JSON line per epoch
+        self.wrapped = []     # (object, name) of the wrappers set
+        self.system = None
+        self.latest = None    # numbers of the last complete epoch
+        self.clear()
+
+    def clear(self):
+        self.times = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.proposals = 0
+        self.flips = 0
+        self.start = time.perf_counter()
+
+    def wrap(self, obj, name, proposals=None, on_return=None):
+        # Time obj.name, proposals(*args) counts the spin proposals of a call for the acceptance rate
+        method = getattr(obj, name)
+
+        def timed(*args, **kwargs):
+            flips = getattr(obj, 'flips', 0)
+            t0 = time.perf_counter()
+            result = method(*args, **kwargs)
+            self.times[name] += time.perf_counter() - t0
+            self.calls[name] += 1
+            if proposals is not None:
+                self.proposals += proposals(*args, **kwargs)
+                self.flips += obj.flips - flips
+            if on_return is not None:
+                on_return(obj)
+            return result
+
+        setattr(obj, name, timed)
+        self.wrapped.append((obj, name))
+
+    def attach(self, system, renderer=None):
+        proposals = {'step': lambda: 1, 'sweep': lambda: system.N, 'run': lambda steps: steps}
+        for name in self.methods:
+            if hasattr(system, name):
+                self.wrap(system, name, proposals.get(name), self.end_epoch if name == 'reset_cache' else None)
+        if renderer is not None:
+            self.wrap(renderer, 'poll')
+        self.system = system
+        system.profiler = self
+        self.clear()
+
+    def detach(self):
+        for obj, name in self.wrapped:
+            delattr(obj, name)  # the class method shows through again
+        self.wrapped = []
+        if self.system is not None:
+            del self.system.profiler
+            self.system = None
+
+    def end_epoch(self, system):
+        wall = time.perf_counter() - self.start
+        local = sum(self.times[name] for name in self.local)
+        self.latest = {'epoch': system.epoch, 'wall': wall,
+                       'flips_per_s': self.flips / local if local > 0 else 0.0,
+                       'acceptance': self.flips / self.proposals if self.proposals else None,
+                       'E': float(system.E), 'B': float(system.B),
+                       'phases': {name: {'calls': self.calls[name], 'time': self.times[name]} for name in self.calls}}
+        if self.emit:
+            print(json.dumps(self.latest), file=self.stream)
+        self.clear()
+
+    def hud(self):
+        # Short text for the window
+        if self.latest is None:
+            return ''
+        acceptance = self.latest['acceptance']
+        return '{:.3g} flips/s | acc = {}'.format(self.latest['flips_per_s'],
+                                                   '-' if acceptance is None else '{:.3f}'.format(acceptance))
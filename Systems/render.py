@@ -0,0 +1,143 @@
+import numpy as np
+import pygame
+
+'''
+Pygame front end for the systems in Systems/.
+
+The physics modules never import this file at module level. A window is only opened when a Renderer is
+constructed, which System.redraw() does the first time it is called, so batch jobs on display-less nodes
+never touch pygame.
+
+Lattices are drawn as images rather than one shape per spin: the spin array indexes a colour lookup table
+(lut[1] for spin +1, lut[-1] for spin -1, lut[0] for empty cells) giving one RGB pixel per spin, which is
+scaled up and blitted in a single call. The per-frame cost is a few array operations whatever the lattice size.
+'''
+
+
+def colour_table(colours):
+    # Colour lookup indexed by cell value, [0] empty, [1] spin +1, [2] (= [-1]) spin -1
+    return np.array(colours, dtype=np.uint8)
+
+
+def blit_spins(win, cells, lut, pos, scale):
+    # cells is indexed [x, y] with values 1, -1 or 0, each cell becomes a scale x scale square
+    surface = pygame.surfarray.make_surface(lut[cells])
+    win.blit(pygame.transform.scale(surface, (cells.shape[0] * scale, cells.shape[1] * scale)), pos)
+
+
+def chain_cells(L, per_row):
+    # Lay a chain out in rows of per_row spins with an empty row under each, indexed [x, y]
+    rows = -(-len(L) // per_row)
+    cells = np.zeros(rows * per_row, dtype=int)
+    cells[:len(L)] = L
+    grid = np.zeros((per_row, 2 * rows), dtype=int)
+    grid[:, ::2] = cells.reshape(rows, per_row).T
+    return grid
+
+
+class Renderer2D():
+    lattice_area = 800
+    p = 10 # padding
+    font_size = 16
+    bg_color = (25, 25, 25) # (250, 250, 250)
+    colours = [(166, 166, 166), (0, 50, 50), (163, 0, 30)]  # [0] for pen, [1] for spin 1, [2] for spin -1
+    counter_width = 75
+
+    def __init__(self, system):
+        p = Renderer2D.p
+        self.ScreenWidth, self.ScreenHeight = self.ScreenDims = (2*p + self.lattice_area, 2*p + self.font_size + self.lattice_area)  # (1800, 920)
+
+        pygame.init()
+        pygame.display.set_caption('2D-Ising model | ' + system.algorithm + ' Implementation')
+        pygame.display.set_icon(pygame.image.load('imgs/molecules.png'))
+        self.font_local = pygame.font.SysFont('bahnschrift', self.font_size)
+        self.win = pygame.display.set_mode(self.ScreenDims)
+        self.counter_bg_rect = pygame.Rect((self.ScreenWidth - self.counter_width, 0), (self.counter_width, p + self.font_size))
+
+        self.a = max(self.lattice_area // max(system.n, system.m), 1) # side-length
+        self.lut = colour_table(self.colours)
+
+    def poll(self):
+        # Handle pending events, False once the window has been closed
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return False
+        return True
+
+    def wait(self, ms):
+        pygame.time.wait(ms)
+
+    def redraw(self, system):
+        self.win.fill(self.bg_color)
+
+        # draw spins as a x a squares, spin i, j at x = i, y = j
+        blit_spins(self.win, system.L, self.lut, (self.p, self.p + self.font_size), self.a)
+
+        # draw data for system
+        energy_counter = self.font_local.render('T = {}K | Lattice size = {} | Epoch: {} | <B> = {:.4f} | E/N={:.4f}, <E>/N={:.4f}'.format(
+                                                                                                system.T,
+                                                                                                system.size,
+                                                                                                system.epoch,
+                                                                                                system.Bbar,
+                                                                                                system.E/system.N,
+                                                                                                system.Ebar/system.N),
+                                                                                                1, self.colours[0])
+
+        self.win.blit(energy_counter, (5, 5))
+        if system.profiler is not None:
+            rates = self.font_local.render(system.profiler.hud(), 1, self.colours[0])
+            self.win.blit(rates, (self.ScreenWidth - rates.get_width() - self.counter_width, 5))
+
+        pygame.display.update()
+
+    def blit_counter(self, system, iter):
+        pygame.draw.rect(self.win, self.bg_color, self.counter_bg_rect)
+        running_counter = self.font_local.render('{:.0f}/{:.0f}'.format(iter//1e4, system.cache_limit//1e4), 1, self.colours[0])
+        self.win.blit(running_counter, (self.ScreenWidth - self.counter_width,5))
+        pygame.display.update()
+
+    def quit(self):
+        pygame.quit()
+
+
+class Renderer1D():
+    bg_color = (25, 25, 25) # (250, 250, 250)
+    ScreenWidth, ScreenHeight = ScreenDims = (1100, 650)  # (1800, 920)
+    spin_colours = [0, (0, 50, 50), (163, 0, 30)]  # draw lattice points with -1 spin grey, +1 as cyan
+    r = 10  # spins are 2r x 2r squares, rows 4r apart
+
+    def __init__(self, system):
+        pygame.init()
+        pygame.display.set_caption('1D-Ising model | ' + system.algorithm + ' Implementation')
+        pygame.display.set_icon(pygame.image.load('imgs/molecules.png'))
+        self.font_local = pygame.font.SysFont('bahnschrift', 16)
+        self.win = pygame.display.set_mode(self.ScreenDims)
+
+        self.lut = colour_table([self.bg_color, self.spin_colours[1], self.spin_colours[2]])
+        self.per_row = int((self.ScreenWidth - 2 * self.r) / (2 * self.r)) + 1  # spins per row of the window
+
+    def poll(self):
+        # Handle pending events, False once the window has been closed
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return False
+        return True
+
+    def redraw(self, system):
+        self.win.fill(self.bg_color)
+
+        # draw spins as squares of sides 20 pixels, wrapped into rows
+        blit_spins(self.win, chain_cells(system.L, self.per_row), self.lut, (self.r, 4 * self.r), 2 * self.r)
+
+        # draw data for system
+        text = '<E> = {:.4f}  |  Epoch: {}'.format(system.Ebar, system.epoch)
+        if system.profiler is not None:
+            text += '  |  ' + system.profiler.hud()
+        energy_counter = self.font_local.render(text, 1, (0, 60, 0))
+
+        self.win.blit(energy_counter, (5, 5))
+
+        pygame.display.update()
+
+    def quit(self):
+        pygame.quit()
@@ -0,0 +1,127 @@
+import numpy as np
+
+'''
+Histogram reweighting of recorded (E, M) series to a continuous range of temperatures.
+
+A run at b0 samples states with probability exp(-b0 E) / Z(b0), so the same samples weighted by
+exp(-(b - b0) E) are a sample at any nearby b (Ferrenberg-Swendsen single histogram). Several runs at
+b_1..b_K are combined by the multi-histogram method (WHAM): every sample i, from whichever run, gets the weight
+    w_i(b) = exp(-b E_i) / sum_k n_k exp(-b_k E_i) / Z_k
+where the Z_k = sum_i exp(-b_k E_i) / sum_l n_l exp(-b_l E_i) / Z_l are solved for self-consistently (up to one
+common factor). With a single run this is exactly the single histogram.
+
+From the weights, per site with e = E/N and m = |M| (M the mean spin, like System.B):
+    E = <e>,  C = b^2 N (<e^2> - <e>^2),  M = <m>,  chi = b N (<m^2> - <m>^2),  U = 1 - <m^4> / (3 <m^2>^2)
+Error bars are jackknife estimates over `blocks` contiguous blocks of every run, so they include the
+autocorrelation of the series as long as a block is much longer than tau.
+
+Reweighting is only reliable where the target energy distribution overlaps the sampled ones, roughly within
+a few standard deviations of the sampled energies, which narrows as 1/sqrt(N) with the lattice size.
+
+usage:
+    rw = Reweighting([(T, E, M)], N)        # E total energies, M mean spins, e.g. Trajectory(path).index
+    table = rw.observables(np.linspace(2.2, 2.35, 100))
+    table['C'], table['C_err']
+'''
+
+names = ('E', 'C', 'M', 'chi', 'U')
+
+
+def log_sum_exp(a, axis=None):
+    top = np.max(a, axis=axis, keepdims=True)
+    return np.squeeze(top + np.log(np.sum(np.exp(a - top), axis=axis, keepdims=True)), axis=axis)
+
+
+def solve(E, n, b, log_Z=None, tol=1e-10, max_iter=10000):
+    # ln of the WHAM denominator sum_k n_k exp(-b_k E_i) / Z_k for every pooled sample, and the ln Z_k,
+    # iterated from the guess log_Z. The Ising energies are discrete, so the sums run over the distinct
+    # energies (the histogram) weighted by how often each was seen
+    levels, inverse, counts = np.unique(E, return_inverse=True, return_counts=True)
+    log_n, log_counts = np.log(n), np.log(counts)[:, None]
+    exponents = -np.outer(levels, b)  # (energies, runs)
+    log_Z = np.zeros(len(b)) if log_Z is None else log_Z
+    for _ in range(max_iter):
+        log_den = log_sum_exp(log_n - log_Z + exponents, axis=1)
+        new = log_sum_exp(log_counts + exponents - log_den[:, None], axis=0)
+        new -= new[0]  # Z is only fixed up to a common factor
+        if np.max(np.abs(new - log_Z)) < tol:
+            log_Z = new
+            break
+        log_Z = new
+    return log_sum_exp(log_n - log_Z + exponents, axis=1)[inverse], log_Z
+
+
+def moments(E, M, log_den, b, N):
+    # (E, C, M, chi, U) at inverse temperature b
+    log_w = -b * E - log_den
+    w = np.exp(log_w - log_sum_exp(log_w))
+    e, m = E / N, np.abs(M)
+    e1, e2 = w @ e, w @ e**2
+    m1, m2, m4 = w @ m, w @ m**2, w @ m**4
+    return np.array([e1, b**2 * N * (e2 - e1**2), m1, b * N * (m2 - m1**2), 1 - m4 / (3 * m2**2)])
+
+
+class Reweighting():
+    def __init__(self, runs, N, blocks=20):
+        # runs: list of (T, E, M) with the series of total energies and mean spins of each run
+        self.N = N
+        self.blocks = blocks
+        self.b = np.array([1 / T for T, _, _ in runs])
+        self.E = [np.asarray(E, dtype=float) for _, E, _ in runs]
+        self.M = [np.asarray(M, dtype=float) for _, _, M in runs]
+        if min(len(E) for E in self.E) < blocks:
+            raise ValueError('Every run needs at least {} samples for the jackknife blocks'.format(blocks))
+
+        self.log_den, self.log_Z = self.fit(np.ones(sum(len(E) for E in self.E), dtype=bool))
+
+        # Jackknife samples: block j of every run left out
+        self.masks = []
+        for j in range(blocks):
+            mask = []
+            for E in self.E:
+                edges = np.linspace(0, len(E), blocks + 1).astype(int)
+                keep = np.ones(len(E), dtype=bool)
+                keep[edges[j]:edges[j + 1]] = False
+                mask.append(keep)
+            self.masks.append(np.concatenate(mask))
+        self.jackknife = [self.fit(mask, self.log_Z)[0] for mask in self.masks]
+
+    def fit(self, mask, log_Z=None):
+        # WHAM on the samples selected by mask (over the runs concatenated)
+        counts, start = [], 0
+        for E in self.E:
+            counts.append(np.count_nonzero(mask[start:start + len(E)]))
+            start += len(E)
+        return solve(np.concatenate(self.E)[mask], np.array(counts), self.b, log_Z)
+
+    def observables(self, temperatures):
+        # Table of E, C, M, chi, U and their jackknife errors (name + '_err') on the temperature grid
+        E, M = np.concatenate(self.E), np.concatenate(self.M)
+        temperatures = np.asarray(temperatures, dtype=float)
+        values = np.empty((len(temperatures), len(names)))
+        errors = np.empty_like(values)
+        K = self.blocks
+        for t, T in enumerate(temperatures):
+            b = 1 / T
+            values[t] = moments(E, M, self.log_den, b, self.N)
+            samples = np.array([moments(E[mask], M[mask], log_den, b, self.N)
+                                for mask, log_den in zip(self.masks, self.jackknife)])
+            errors[t] = np.sqrt((K - 1) / K * np.sum((samples - samples.mean(axis=0))**2, axis=0))
+
+        table = {'T': temperatures}
+        for i, name in enumerate(names):
+            table[name] = values[:, i]
+            table[name + '_err'] = errors[:, i]
+        return table
+
+
+def from_trajectories(paths, temperatures, N=None, blocks=20):
+    # Reweighting of runs recorded with Systems.trajectory (the index holds step, E, M per frame)
+    from Systems.trajectory import Trajectory
+
+    runs = []
+    for path, T in zip(paths, temperatures):
+        trajectory = Trajectory(path)
+        N = trajectory.N if N is None else N
+        runs.append((T, trajectory.index['E'], trajectory.index['M']))
+    return Reweighting(runs, N, blocks)
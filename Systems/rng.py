@@ -0,0 +1,84 @@
+import numpy as np
+
+'''
+Block-buffered random numbers for the single-spin step path.
+
+Every numpy call has a fixed overhead that is much larger than the cost of drawing one number, so a
+step() that calls np.random.randint twice and np.random.uniform once spends most of its time in numpy.
+BlockRNG draws site indices and uniforms block_size at a time and hands them out one by one as python
+numbers, refilling a block when it runs out.
+
+usage:
+    rng = BlockRNG(N)           # site indices in [0, N)
+    k = rng.site()              # flat site index, i, j = divmod(k, m) for an n x m lattice
+    r = rng.uniform()           # uniform in [0, 1)
+    i = rng.randint(low, high)  # any other integer range, drawn from the uniform block
+
+For checkpoints the generator state from just before each block was drawn is kept, so get_state() is a few
+numbers rather than the blocks themselves, and set_state() redraws the blocks exactly.
+'''
+
+
+class BlockRNG():
+    block_size = 2**16  # numbers drawn per refill
+
+    def __init__(self, N, block_size=None, seed=None):
+        self.N = N  # site indices are drawn from [0, N)
+        if block_size is not None:
+            self.block_size = int(block_size)
+
+        # Bulk draws (whole lattices, sweeps) should use the generator directly so there is a single stream
+        self.generator = np.random.default_rng(seed)
+
+        self.sites = []
+        self.uniforms = []
+        self.i_site = 0     # position in the current block of sites
+        self.i_uniform = 0  # position in the current block of uniforms
+        self.site_state = None     # generator state the current block of sites was drawn from
+        self.uniform_state = None  # generator state the current block of uniforms was drawn from
+
+    def draw_sites(self):
+        return self.generator.integers(0, self.N, size=self.block_size).tolist()
+
+    def draw_uniforms(self):
+        return self.generator.random(self.block_size).tolist()
+
+    def site(self):
+        if self.i_site == len(self.sites):
+            self.site_state = self.generator.bit_generator.state
+            self.sites = self.draw_sites()
+            self.i_site = 0
+        self.i_site += 1
+        return self.sites[self.i_site - 1]
+
+    def uniform(self):
+        if self.i_uniform == len(self.uniforms):
+            self.uniform_state = self.generator.bit_generator.state
+            self.uniforms = self.draw_uniforms()
+            self.i_uniform = 0
+        self.i_uniform += 1
+        return self.uniforms[self.i_uniform - 1]
+
+    def get_state(self):
+        # Everything needed to continue the exact same stream, plain python (JSON serialisable)
+        return {'generator': self.generator.bit_generator.state, 'block_size': self.block_size,
+                'site_state': self.site_state, 'i_site': self.i_site,
+                'uniform_state': self.uniform_state, 'i_uniform': self.i_uniform}
+
+    def set_state(self, state):
+        self.block_size = state['block_size']
+        bit_generator = self.generator.bit_generator
+        self.sites, self.uniforms = [], []
+        self.site_state, self.uniform_state = state['site_state'], state['uniform_state']
+        if self.site_state is not None:
+            bit_generator.state = self.site_state
+            self.sites = self.draw_sites()
+        if self.uniform_state is not None:
+            bit_generator.state = self.uniform_state
+            self.uniforms = self.draw_uniforms()
+        self.i_site, self.i_uniform = state['i_site'], state['i_uniform']
+        bit_generator.state = state['generator']
+
+    def randint(self, low, high):
+        # Integer in [low, high), the bias from scaling a double is negligible for lattice sized ranges
+        return low + int(self.uniform() * (high - low))
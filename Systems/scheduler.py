@@ -0,0 +1,50 @@
+import time
+
+'''
+Decouples simulation work from drawing and event handling.
+
+The simulation is run in chunks (one call of work() each, e.g. one epoch) as fast as it goes. Between chunks
+the scheduler checks the wall clock and only runs ui() (poll events + redraw) once per frame, so the UI is
+refreshed at a fixed rate however fast the steps are, and a quit event is seen within a frame plus one chunk.
+
+usage:
+    scheduler = Scheduler(rate=30)
+    scheduler.run(work, ui)     # work() -> False when finished, ui() -> False on quit
+    print(scheduler.report())
+'''
+
+
+class Scheduler():
+    def __init__(self, rate=30):
+        self.frame = 1 / rate   # seconds between ui() calls
+        self.sim_time = 0       # wall time spent in work()
+        self.ui_time = 0        # wall time spent in ui()
+        self.chunks = 0
+        self.frames = 0
+
+    def run(self, work, ui=None):
+        # Returns True if work() finished, False if ui() asked to quit
+        next_frame = time.perf_counter()
+        while True:
+            t0 = time.perf_counter()
+            if ui is not None and t0 >= next_frame:
+                keep_running = ui()
+                t1 = time.perf_counter()
+                self.ui_time += t1 - t0
+                self.frames += 1
+                next_frame = t0 + self.frame
+                if keep_running is False:
+                    return False
+                t0 = t1
+
+            more = work()
+            self.sim_time += time.perf_counter() - t0
+            self.chunks += 1
+            if more is False:
+                return True
+
+    def report(self):
+        total = max(self.sim_time + self.ui_time, 1e-12)
+        return 'Simulation: {:.1f}% ({:.2f}s, {} chunks) | UI: {:.1f}% ({:.2f}s, {} frames)'.format(
+            100 * self.sim_time / total, self.sim_time, self.chunks,
+            100 * self.ui_time / total, self.ui_time, self.frames)
@@ -0,0 +1,117 @@
+import multiprocessing as mp
+
+import numpy as np
+
+'''
+Parallel tempering (replica exchange) for the 2D system.
+
+K replicas of Systems.MCMC_2D.System live in their own worker processes, one per temperature of a ladder.
+Every epoch each replica does `sweeps` checkerboard sweeps at its current temperature and reports its energy
+and the epoch averages from reset_cache(). Then neighbouring temperatures try to swap replicas with the
+Metropolis rule
+    P(swap) = min(1, exp((b_i - b_j) * (E_i - E_j)))
+Only the temperatures move, each worker just gets its new T, lattices never leave their process.
+
+Observables are accumulated per temperature (not per replica) with the same running average reset_cache() uses:
+    Ebar[t] += (Ebari - Ebar[t]) / epoch
+
+usage:
+    with ReplicaExchange(np.linspace(1.5, 3, 8), n=64) as pt:
+        for epoch in range(1000):
+            pt.step()
+        print(pt.temperatures, pt.Ebar, pt.Bbar, pt.acceptance())
+'''
+
+
+def worker(pipe, n, T, seed):
+    from Systems.MCMC_2D import System
+
+    system = System(seed=seed, n=n)
+    system.T = T
+    while True:
+        command, arg = pipe.recv()
+        if command == 'run':
+            for _ in range(arg):
+                system.sweep()
+            system.reset_cache()
+            pipe.send((system.E, system.latest_Ebar, system.latest_Bbar))
+        elif command == 'T':
+            system.T = arg
+        elif command == 'stop':
+            break
+
+
+class ReplicaExchange():
+    def __init__(self, temperatures, n=None, sweeps=10, seed=None):
+        self.temperatures = np.sort(np.asarray(temperatures, dtype=float))
+        self.K = len(self.temperatures)
+        self.sweeps = sweeps  # sweeps between swap attempts (the swap interval)
+
+        # replica[t] is the replica currently at temperature t
+        self.replica = list(range(self.K))
+        self.E = np.zeros(self.K)  # latest energy of each replica
+
+        # Per temperature running averages, as in System.reset_cache()
+        self.epoch = 0
+        self.Ebar = np.zeros(self.K)
+        self.Bbar = np.zeros(self.K)
+        self.latest_Ebar = np.zeros(self.K)
+        self.latest_Bbar = np.zeros(self.K)
+
+        # Swap statistics between temperatures t and t+1
+        self.tried = np.zeros(self.K - 1, dtype=int)
+        self.accepted = np.zeros(self.K - 1, dtype=int)
+
+        seeds = np.random.SeedSequence(seed).spawn(self.K + 1)
+        self.generator = np.random.default_rng(seeds[-1])
+        self.pipes, self.processes = [], []
+        for r in range(self.K):
+            parent, child = mp.Pipe()
+            process = mp.Process(target=worker, args=(child, n, self.temperatures[r], seeds[r]), daemon=True)
+            process.start()
+            self.pipes.append(parent)
+            self.processes.append(process)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        for pipe, process in zip(self.pipes, self.processes):
+            pipe.send(('stop', None))
+            process.join()
+        self.pipes, self.processes = [], []
+
+    def step(self):
+        # One epoch: all replicas run in parallel, then one round of swap attempts
+        for pipe in self.pipes:
+            pipe.send(('run', self.sweeps))
+        results = [pipe.recv() for pipe in self.pipes]
+
+        self.epoch += 1
+        for t, r in enumerate(self.replica):
+            self.E[r], Ebari, Bbari = results[r]
+            self.latest_Ebar[t], self.latest_Bbar[t] = Ebari, Bbari
+            self.Ebar[t] += (Ebari - self.Ebar[t]) / self.epoch
+            self.Bbar[t] += (Bbari - self.Bbar[t]) / self.epoch
+
+        self.swap()
+
+    def swap(self):
+        # Alternate between the even and odd pairs so no temperature is in two attempts at once
+        b = 1 / self.temperatures
+        for t in range(self.epoch % 2, self.K - 1, 2):
+            r1, r2 = self.replica[t], self.replica[t + 1]
+            delta = (b[t] - b[t + 1]) * (self.E[r1] - self.E[r2])
+            self.tried[t] += 1
+            if delta >= 0 or self.generator.random() < np.exp(delta):
+                self.accepted[t] += 1
+                self.replica[t], self.replica[t + 1] = r2, r1
+                self.pipes[r1].send(('T', self.temperatures[t + 1]))
+                self.pipes[r2].send(('T', self.temperatures[t]))
+
+    def acceptance(self):
+        # Fraction of accepted swaps between each pair of neighbouring temperatures
+        return self.accepted / np.maximum(self.tried, 1)
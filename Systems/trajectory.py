@@ -0,0 +1,137 @@
+import json
+import os
+import queue
+import threading
+
+import numpy as np
+
+'''
+Bit-packed lattice trajectories for post-hoc analysis.
+
+Each frame is the lattice flattened and packed to one bit per spin (np.packbits, a set bit is a +1 spin), so
+a 200 x 200 frame takes 5000 bytes instead of 320000 as int64. The two .npy files are preallocated for all the
+frames up front and written through memory maps:
+    path + '.npy'           uint8 (frames, ceil(N / 8))     the packed lattices
+    path + '.index.npy'     (step, E, M) per frame          step = -1 for frames not written yet
+    path + '.json'          the lattice shape
+Being plain .npy files they open with np.load(..., mmap_mode='r') anywhere.
+
+A writer opened with append=True carries on after the frames already in the files (e.g. after resuming from a
+checkpoint), dropping any recorded after step `after` so frames from work that is being redone aren't kept
+twice. The files grow if the new capacity is larger than the one they were made with.
+
+The sampler only packs the lattice (a copy it needs anyway) and puts it on a queue; a background thread copies
+frames into the memory maps and leaves the page cache to reach the disk, so add() never waits on disk.
+
+usage:
+    recorder = TrajectoryWriter('run', system.L.shape, frames=10000)
+    recorder.add(step, system.E, system.B, system.L)     # e.g. every k sweeps
+    recorder.close()
+    recorder = TrajectoryWriter('run', system.L.shape, frames=10000, append=True, after=system.epoch)
+
+    trajectory = Trajectory('run')
+    trajectory[i]               # +-1 lattice of frame i
+    trajectory.packed(i)        # the packed bytes of frame i, a view of the memory map (no copy)
+    trajectory.index['E']       # energies of all written frames
+'''
+
+index_dtype = np.dtype([('step', '<i8'), ('E', '<f8'), ('M', '<f8')])
+
+
+class TrajectoryWriter():
+    def __init__(self, path, shape, frames, maxsize=0, append=False, after=None):
+        self.path = path
+        self.shape = tuple(shape)
+        self.frames = frames  # capacity, add() raises once it is full
+        self.N = int(np.prod(self.shape))
+        self.count = 0
+
+        if append and os.path.exists(path + '.index.npy'):
+            with open(path + '.json') as f:
+                saved = tuple(json.load(f)['shape'])
+            if saved != self.shape:
+                raise ValueError('Cannot append frames of shape {} to a trajectory of {}'.format(self.shape, saved))
+            self.data = np.lib.format.open_memmap(path + '.npy', mode='r+')
+            self.index = np.lib.format.open_memmap(path + '.index.npy', mode='r+')
+            if frames > len(self.index):
+                # Grow the files to the new capacity, the frames so far are copied over
+                data, index = np.array(self.data), np.array(self.index)
+                del self.data, self.index
+                self.data = np.lib.format.open_memmap(path + '.npy', mode='w+', dtype=np.uint8,
+                                                      shape=(frames, data.shape[1]))
+                self.index = np.lib.format.open_memmap(path + '.index.npy', mode='w+', dtype=index_dtype,
+                                                       shape=(frames,))
+                self.data[:len(data)] = data
+                self.index['step'] = -1
+                self.index[:len(index)] = index
+            self.frames = len(self.index)
+            written = self.index['step'] >= 0
+            if after is not None:
+                written &= self.index['step'] <= after
+            self.count = int(np.count_nonzero(written))  # frames are written in order
+            self.index['step'][self.count:] = -1
+        else:
+            self.data = np.lib.format.open_memmap(path + '.npy', mode='w+', dtype=np.uint8,
+                                                  shape=(frames, -(-self.N // 8)))
+            self.index = np.lib.format.open_memmap(path + '.index.npy', mode='w+', dtype=index_dtype, shape=(frames,))
+            self.index['step'] = -1
+            with open(path + '.json', 'w') as f:
+                json.dump({'shape': self.shape}, f)
+
+        # Frames waiting for the writer thread, maxsize=0 never blocks the sampler
+        self.queue = queue.Queue(maxsize)
+        self.thread = threading.Thread(target=self._write, daemon=True)
+        self.thread.start()
+
+    def _write(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            i, packed, step, E, M = item
+            self.data[i] = packed
+            self.index[i] = (step, E, M)  # last, so a reader only counts frames whose data is in place
+
+    def add(self, step, E, M, L):
+        if self.count == self.frames:
+            raise IndexError('The trajectory is full ({} frames)'.format(self.frames))
+        if L.shape != self.shape:
+            raise ValueError('Frame of shape {} in a trajectory of {}'.format(L.shape, self.shape))
+        self.queue.put((self.count, np.packbits(L.reshape(-1) > 0), step, E, M))
+        self.count += 1
+
+    def close(self):
+        # Write everything still queued and flush the files
+        self.queue.put(None)
+        self.thread.join()
+        self.data.flush()
+        self.index.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Trajectory():
+    def __init__(self, path):
+        self.data = np.load(path + '.npy', mmap_mode='r')
+        index = np.load(path + '.index.npy', mmap_mode='r')
+        self.frames = int(np.count_nonzero(index['step'] >= 0))  # written in order, the rest is still -1
+        self.index = index[:self.frames]
+        with open(path + '.json') as f:
+            self.shape = tuple(json.load(f)['shape'])
+        self.N = int(np.prod(self.shape))
+
+    def __len__(self):
+        return self.frames
+
+    def packed(self, i):
+        if not -self.frames <= i < self.frames:
+            raise IndexError('Frame {} of a trajectory of {}'.format(i, self.frames))
+        return self.data[i % self.frames]
+
+    def __getitem__(self, i):
+        bits = np.unpackbits(self.packed(i), count=self.N)
+        return (bits.astype(np.int8) * 2 - 1).reshape(self.shape)
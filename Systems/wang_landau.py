@@ -0,0 +1,141 @@
+import numpy as np
+
+from Systems import kernels
+from Systems.MCMC_2D import J
+from Systems.reweighting import log_sum_exp
+
+'''
+Wang-Landau estimate of the density of states g(E) of a 2D system.
+
+The walk moves through energies rather than temperatures: a single spin flip from E to E' is accepted with
+min(1, g(E) / g(E')) using the current estimate, and after every proposal the estimate at the (new or old)
+energy is raised, ln g(E) += ln f, and its histogram H(E) += 1. Rare energies are thereby made as likely as
+common ones. Whenever H is flat (min H >= flatness * mean H over the energies visited so far) ln f is halved and
+H cleared, down to ln f < ln_f_final. The error of ln g is of order sqrt(ln f).
+
+Energies are E = -J (bonds) + 2J level for level = 0...bonds, every flip moves the level by s * (neighbour sum)
+so the open boundaries (odd neighbour sums at the edges) are covered too. Levels that are never visited (like
+one bond short of the ground state on a periodic lattice) have no states and are left out of every sum.
+ln g is normalised so that the states add up to 2^N.
+
+From g(E) every temperature follows at once, per site:
+    Z = sum_E g(E) exp(-b E),  E = <E> / N,  C = b^2 (<E^2> - <E>^2) / N,  f = -ln Z / (b N),  s = (E - f) b
+
+step() is the reference move and goes through system.get_dE, run() the same proposals in a compiled kernel.
+The system's lattice is used as the walker, system.E and B follow it.
+
+usage:
+    wl = WangLandau(System(seed=0, n=16))
+    wl.converge()
+    wl.thermodynamics(np.linspace(1.5, 3.5, 201))['C']
+'''
+
+
+class WangLandau():
+    flatness = 0.8          # min H / mean H for a flat histogram
+    ln_f_final = 1e-8       # ln f to stop at
+    check_every = 10000     # proposals between flatness checks (and at least 100 per spin)
+
+    def __init__(self, system, flatness=None, ln_f_final=None, ln_f=1.0):
+        self.system = system
+        self.flatness = self.flatness if flatness is None else flatness
+        self.ln_f_final = self.ln_f_final if ln_f_final is None else ln_f_final
+        self.ln_f = ln_f
+
+        self.bonds = len(system.bonds[0])
+        self.energies = -J * self.bonds + 2 * J * np.arange(self.bonds + 1)
+        self.ln_g = np.zeros(self.bonds + 1)
+        self.H = np.zeros(self.bonds + 1, dtype=np.int64)
+        self.visited = np.zeros(self.bonds + 1, dtype=bool)
+
+        self.level = int(round((system.get_Ei() + J * self.bonds) / (2 * J)))
+        self.stages = 0
+        self.proposals = 0
+
+    def sync(self):
+        # The system's E and B after the walker moved
+        self.system.E = float(self.energies[self.level])
+        self.system.B = self.system.get_Bi()
+
+    def step(self):
+        system = self.system
+        k = system.rng.site()
+        i, j = divmod(k, system.m)
+        new = self.level + int(round(system.get_dE(i, j) / (2 * J)))
+        d = self.ln_g[self.level] - self.ln_g[new]
+        if d >= 0 or system.rng.uniform() < np.exp(d):
+            system.S[k] *= -1
+            system.E = float(self.energies[new])
+            system.B += 2 * system.S[k] / system.N
+            system.flips += 1
+            self.level = new
+        self.ln_g[self.level] += self.ln_f
+        self.H[self.level] += 1
+        self.visited[self.level] = True
+        self.proposals += 1
+
+    def run(self, steps):
+        # Equivalent to step() steps times in one compiled kernel
+        system = self.system
+        sites = system.rng.generator.integers(0, system.N, size=steps)
+        uniforms = system.rng.generator.random(steps)
+        self.level, accepted = kernels.wang_landau(system.S, system.nbr, self.level, self.ln_g, self.H, self.ln_f,
+                                                   sites, uniforms)
+        self.visited |= self.H > 0
+        self.proposals += steps
+        system.flips += accepted
+        self.sync()
+
+    def flat(self):
+        H = self.H[self.visited]
+        return H.sum() > 0 and H.min() >= self.flatness * H.mean()
+
+    def converged(self):
+        return self.ln_f < self.ln_f_final
+
+    def stage(self, max_steps=None):
+        # Walk until the histogram is flat, then halve ln f. Returns False if max_steps ran out first
+        steps = max(self.check_every, self.system.N * 100)
+        done = 0
+        while True:
+            found = np.count_nonzero(self.visited)
+            self.run(steps)
+            done += steps
+            if self.flat() and np.count_nonzero(self.visited) == found:  # no new energy turned up meanwhile
+                break
+            if max_steps is not None and done >= max_steps:
+                return False
+        self.ln_f /= 2
+        self.H[:] = 0
+        self.stages += 1
+        return True
+
+    def converge(self, max_steps=None, verbose=False):
+        # Stages until ln f < ln_f_final, max_steps bounds every stage
+        while not self.converged():
+            if not self.stage(max_steps):
+                return False
+            if verbose:
+                print('stage {}: ln f = {:.3g}, {} proposals'.format(self.stages, self.ln_f, self.proposals))
+        return True
+
+    def log_g(self):
+        # Normalised ln g over the visited levels, -inf elsewhere
+        ln_g = np.full(len(self.ln_g), -np.inf)
+        ln_g[self.visited] = self.ln_g[self.visited]
+        return ln_g - log_sum_exp(ln_g[self.visited]) + self.system.N * np.log(2)
+
+    def thermodynamics(self, temperatures):
+        # Table of log_Z, E, C, f and s per site on the temperature grid
+        temperatures = np.asarray(temperatures, dtype=float)
+        N = self.system.N
+        E, ln_g = self.energies[self.visited], self.log_g()[self.visited]
+        b = 1 / temperatures[:, None]
+        log_w = ln_g[None, :] - b * E[None, :]
+        log_Z = log_sum_exp(log_w, axis=1)
+        w = np.exp(log_w - log_Z[:, None])
+        e1, e2 = w @ E, w @ E**2
+        b = b[:, 0]
+        f = -log_Z / (b * N)
+        return {'T': temperatures, 'log_Z': log_Z, 'E': e1 / N, 'C': b**2 * (e2 - e1**2) / N,
+                'f': f, 's': b * (e1 / N - f)}
@@ -0,0 +1,23 @@
+import numpy as np
+
+from Systems.tempering import ReplicaExchange
+
+'''
+Parallel tempering run over a ladder of temperatures around Tc, one worker process per temperature.
+'''
+
+temperatures = np.linspace(1.8, 2.8, 16)
+n = 32            # lattice side
+sweeps = 10       # sweeps per replica between swap attempts
+epochs = 2000
+
+if __name__ == '__main__':
+    print('Replicas: {}, Lattice size: {}, Sweeps per swap: {}, Epochs: {}'.format(len(temperatures), (n, n), sweeps, epochs))
+    with ReplicaExchange(temperatures, n=n, sweeps=sweeps) as pt:
+        for epoch in range(1, epochs+1):
+            pt.step()
+            if epoch % 100 == 0:
+                print('Epoch: {} | Swap acceptance: {}'.format(epoch, np.round(pt.acceptance(), 3)))
+
+        for T, Ebar, Bbar in zip(pt.temperatures, pt.Ebar, pt.Bbar):
+            print('T = {:.4f} | <E>/N = {:.4f} | <B> = {:.4f}'.format(T, Ebar / n**2, Bbar))